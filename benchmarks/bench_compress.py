@@ -0,0 +1,59 @@
+# Reports compression throughput on a synthetic tree for several worker counts.
+#
+#   python -m benchmarks.bench_compress --profile mixed --workers 1 2 4 8
+#
+# The "zipfile" row is the sequential zipfile.ZIP_DEFLATED loop that
+# select_directory used before, kept as the reference point.
+import argparse
+import os
+import tempfile
+import time
+import zipfile
+
+from benchmarks.trees import MIB, PROFILES, generate_tree
+from release_automation.compression import compress_directory
+
+
+def zipfile_baseline(directory, zip_path):
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        for root, dirs, files in os.walk(directory):
+            for file in files:
+                file_path = os.path.join(root, file)
+                zipf.write(file_path, os.path.relpath(file_path, directory))
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Directory compression throughput")
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='mixed')
+    parser.add_argument('--scale', type=float, default=1.0)
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tree = os.path.join(tmp, 'tree')
+        files, total = generate_tree(tree, args.profile, args.scale)
+        zip_path = os.path.join(tmp, 'out.zip')
+        mib = total / MIB
+        print(f"{files} files, {mib:.1f} MiB")
+        print(f"{'engine':>12}  {'seconds':>8}  {'MB/s':>8}  {'zip MiB':>8}")
+
+        elapsed = timed(zipfile_baseline, tree, zip_path)
+        print(f"{'zipfile':>12}  {elapsed:>8.2f}  {mib / elapsed:>8.1f}  "
+              f"{os.path.getsize(zip_path) / MIB:>8.1f}")
+        for workers in args.workers:
+            # Not incremental: every row must compress from scratch rather than
+            # copy members out of the previous row's archive
+            elapsed = timed(compress_directory, tree, zip_path, workers=workers, incremental=False)
+            print(f"{f'{workers} workers':>12}  {elapsed:>8.2f}  {mib / elapsed:>8.1f}  "
+                  f"{os.path.getsize(zip_path) / MIB:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
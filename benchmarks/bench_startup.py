@@ -0,0 +1,60 @@
+# Measures CLI startup with -X importtime and checks the headless path never
+# imports Tk.
+#
+#   python -m benchmarks.bench_startup
+import argparse
+import subprocess
+import sys
+
+# Modules that must not be imported by the headless CLI
+GUI_MODULES = ("tkinter", "_tkinter", "customtkinter")
+
+COMMANDS = {
+    "--help": ["-m", "release_automation", "--help"],
+    "publish --help": ["-m", "release_automation", "publish", "--help"],
+    # Loads the whole upload pipeline, as an actual publish does
+    "pipeline import": ["-c", "import release_automation.cli as c; "
+                              "import release_automation.compression, release_automation.github, "
+                              "release_automation.jfrog, release_automation.publish"],
+}
+
+
+def import_times(argv):
+    # Returns ({module: cumulative microseconds}, top-level modules) from
+    # -X importtime output; nested imports are indented under their parent
+    result = subprocess.run([sys.executable, "-X", "importtime", *argv],
+                            capture_output=True, text=True)
+    times = {}
+    top_level = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        times[module.strip()] = int(cumulative_us)
+        if not module[1:].startswith(" "):
+            top_level.add(module.strip())
+    return times, top_level
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CLI startup time")
+    parser.add_argument("--top", type=int, default=5, help="Slowest top-level imports to list")
+    args = parser.parse_args()
+
+    failed = False
+    for label, argv in COMMANDS.items():
+        times, top_level_modules = import_times(argv)
+        top_level = {module: times[module] for module in top_level_modules}
+        total_ms = sum(top_level.values()) / 1000
+        gui = sorted(module for module in times if module.split(".")[0] in GUI_MODULES)
+        print(f"{label}: {total_ms:.1f} ms in imports")
+        for module, us in sorted(top_level.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"  {us / 1000:8.1f} ms  {module}")
+        if gui:
+            print(f"  GUI modules imported: {', '.join(gui)}")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
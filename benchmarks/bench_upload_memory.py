@@ -0,0 +1,106 @@
+# Measures peak RSS of an asset upload for growing file sizes.
+#
+#   python -m benchmarks.bench_upload_memory --sizes 64 256 1024
+#
+# Each upload runs in a fresh child process against a local sink server so
+# ru_maxrss reflects that upload only. With the streaming reader the peak
+# should stay flat; "--mode read" reproduces the old data=f.read() behaviour.
+import argparse
+import http.server
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+
+MIB = 1024 * 1024
+
+
+class SinkHandler(http.server.BaseHTTPRequestHandler):
+    # Reads and discards the request body, like an upload endpoint would
+    def do_POST(self):
+        remaining = int(self.headers.get('Content-Length', 0))
+        while remaining:
+            chunk = self.rfile.read(min(remaining, MIB))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+        self.send_response(201)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    do_PUT = do_POST
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_sink_server():
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), SinkHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def peak_rss_mib():
+    # VmHWM is reset by exec, unlike ru_maxrss, which a child inherits from
+    # its parent on Linux
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / MIB if sys.platform == 'darwin' else peak / 1024
+
+
+def run_child(url, file_path, mode):
+    import requests
+    from release_automation.streaming import ChunkedFileReader
+
+    if mode == 'stream':
+        reader = ChunkedFileReader(file_path)
+        response = requests.post(url, data=reader, headers=reader.headers())
+    else:
+        with open(file_path, 'rb') as f:
+            response = requests.post(url, data=f.read())
+    response.raise_for_status()
+    print(f"{peak_rss_mib():.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak RSS of streaming asset uploads")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[16, 64, 256, 1024],
+                        help="File sizes to upload, in MiB")
+    parser.add_argument('--mode', choices=['stream', 'read'], default='stream')
+    parser.add_argument('--child', nargs=2, metavar=('URL', 'FILE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child[0], args.child[1], args.mode)
+        return
+
+    server = start_sink_server()
+    url = f"http://127.0.0.1:{server.server_address[1]}/upload"
+    print(f"{'size (MiB)':>10}  {'peak RSS (MiB)':>14}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            file_path = os.path.join(tmp, f"asset-{size}.bin")
+            with open(file_path, 'wb') as f:
+                f.truncate(size * MIB)
+            result = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.bench_upload_memory',
+                 '--mode', args.mode, '--child', url, file_path],
+                capture_output=True, text=True, check=True,
+            )
+            os.remove(file_path)
+            print(f"{size:>10}  {result.stdout.strip():>14}")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
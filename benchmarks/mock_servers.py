@@ -0,0 +1,238 @@
+# Local stand-in for the GitHub releases API, uploads.github.com and
+# Artifactory, with configurable latency and bandwidth. One server answers
+# all three; point GitHubUploader(api_url=..., uploads_url=...) and
+# JFrogUploader at its base URL.
+import hashlib
+import http.server
+import itertools
+import json
+import threading
+import time
+from collections import deque
+from urllib.parse import parse_qs, unquote, urlsplit
+
+READ_SIZE = 64 * 1024
+
+
+class MockState:
+    def __init__(self, latency=0.0, bandwidth=None, rate_limit=None, secondary_rate=None):
+        # Seconds added to every response
+        self.latency = latency
+        # Bytes per second accepted for request bodies, None for unlimited
+        self.bandwidth = bandwidth
+        # Requests per hour reported in X-RateLimit-* headers, None for none
+        self.rate_limit = rate_limit
+        self.rate_limit_reset = int(time.time()) + 3600
+        # More requests than this within a second get GitHub's secondary
+        # rate limit response (403 with Retry-After), None for unlimited
+        self.secondary_rate = secondary_rate
+        self.recent = deque()
+        self.throttled = 0
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        # (owner/repo, tag) -> release dict
+        self.releases = {}
+        # sha256 -> size of every artifact Artifactory stores
+        self.artifacts = {}
+        self.requests = 0
+        self.bytes_received = 0
+
+
+class MockHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def log_message(self, format, *args):
+        pass
+
+    def iter_body(self):
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            while True:
+                length = int(self.rfile.readline().split(b';')[0], 16)
+                remaining = length
+                while remaining:
+                    chunk = self.rfile.read(min(remaining, READ_SIZE))
+                    if not chunk:
+                        return
+                    remaining -= len(chunk)
+                    yield chunk
+                self.rfile.readline()
+                if not length:
+                    return
+        remaining = int(self.headers.get('Content-Length', 0))
+        while remaining:
+            chunk = self.rfile.read(min(remaining, READ_SIZE))
+            if not chunk:
+                return
+            remaining -= len(chunk)
+            yield chunk
+
+    def read_stream(self):
+        # Consumes the body (sized or chunked) at no more than the configured
+        # bandwidth and returns (size, sha256)
+        digest = hashlib.sha256()
+        size = 0
+        started = time.monotonic()
+        for chunk in self.iter_body():
+            digest.update(chunk)
+            size += len(chunk)
+            if self.state.bandwidth:
+                ahead = size / self.state.bandwidth - (time.monotonic() - started)
+                if ahead > 0:
+                    time.sleep(ahead)
+        with self.state.lock:
+            self.state.bytes_received += size
+        return size, digest.hexdigest()
+
+    def rate_limited(self):
+        # Sends the secondary rate limit response and returns True when the
+        # request is over secondary_rate; its body is read and discarded
+        state = self.state
+        if not state.secondary_rate:
+            return False
+        now = time.monotonic()
+        with state.lock:
+            while state.recent and now - state.recent[0] > 1.0:
+                state.recent.popleft()
+            if len(state.recent) < state.secondary_rate:
+                state.recent.append(now)
+                return False
+            state.throttled += 1
+        self.read_stream()
+        self.reply(403, {"message": "You have exceeded a secondary rate limit. Please wait a few minutes "
+                                    "before you try again."}, {'Retry-After': '1'})
+        return True
+
+    def reply(self, status, payload=None, headers=None):
+        headers = dict(headers or {})
+        with self.state.lock:
+            self.state.requests += 1
+            if self.state.rate_limit:
+                headers.update({
+                    'X-RateLimit-Limit': str(self.state.rate_limit),
+                    'X-RateLimit-Remaining': str(max(0, self.state.rate_limit - self.state.requests)),
+                    'X-RateLimit-Reset': str(self.state.rate_limit_reset),
+                    'X-RateLimit-Resource': 'core',
+                })
+        if self.state.latency:
+            time.sleep(self.state.latency)
+        body = json.dumps(payload).encode() if payload is not None else b''
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def reply_conditional(self, payload):
+        etag = 'W/"%s"' % hashlib.sha1(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+        if self.headers.get('If-None-Match') == etag:
+            return self.reply(304, headers={'ETag': etag})
+        return self.reply(200, payload, {'ETag': etag})
+
+    def route(self):
+        parts = urlsplit(self.path)
+        return [unquote(p) for p in parts.path.strip('/').split('/')], parse_qs(parts.query)
+
+    def do_POST(self):
+        if self.rate_limited():
+            return
+        path, query = self.route()
+        # /repos/{owner}/{repo}/releases
+        if len(path) == 4 and path[0] == 'repos' and path[3] == 'releases':
+            data = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            return self.create_release(f"{path[1]}/{path[2]}", json.loads(data or b'{}').get('tag_name'))
+        size, sha256 = self.read_stream()
+        # /repos/{owner}/{repo}/releases/{id}/assets?name=
+        if len(path) == 6 and path[3] == 'releases' and path[5] == 'assets':
+            return self.create_asset(f"{path[1]}/{path[2]}", int(path[4]), query['name'][0], size, sha256)
+        self.reply(404, {"message": "Not Found"})
+
+    def create_release(self, repo, tag):
+        with self.state.lock:
+            if (repo, tag) in self.state.releases:
+                return self.reply(422, {"message": "Validation Failed",
+                                        "errors": [{"code": "already_exists"}]})
+            release = {"id": next(self.state.ids), "tag_name": tag, "assets": []}
+            self.state.releases[(repo, tag)] = release
+        self.reply(201, release)
+
+    def create_asset(self, repo, release_id, name, size, sha256):
+        with self.state.lock:
+            release = next((r for (r_repo, _), r in self.state.releases.items()
+                            if r_repo == repo and r["id"] == release_id), None)
+            if release is None:
+                return self.reply(404, {"message": "Not Found"})
+            if any(asset["name"] == name for asset in release["assets"]):
+                return self.reply(422, {"message": "Validation Failed",
+                                        "errors": [{"code": "already_exists"}]})
+            asset = {"id": next(self.state.ids), "name": name, "size": size,
+                     "state": "uploaded", "digest": f"sha256:{sha256}"}
+            release["assets"].append(asset)
+        self.reply(201, asset)
+
+    def do_GET(self):
+        if self.rate_limited():
+            return
+        path, query = self.route()
+        # /repos/{owner}/{repo}/releases/tags/{tag}
+        if len(path) == 6 and path[3] == 'releases' and path[4] == 'tags':
+            release = self.state.releases.get((f"{path[1]}/{path[2]}", path[5]))
+            if release is None:
+                return self.reply(404, {"message": "Not Found"})
+            return self.reply_conditional(release)
+        # /repos/{owner}/{repo}/releases
+        if len(path) == 4 and path[3] == 'releases':
+            repo = f"{path[1]}/{path[2]}"
+            releases = [r for (r_repo, _), r in self.state.releases.items() if r_repo == repo]
+            return self.reply_conditional(list(reversed(releases)))
+        self.reply(404, {"message": "Not Found"})
+
+    def do_DELETE(self):
+        if self.rate_limited():
+            return
+        path, query = self.route()
+        # /repos/{owner}/{repo}/releases/assets/{id}
+        if len(path) == 6 and path[3] == 'releases' and path[4] == 'assets':
+            asset_id = int(path[5])
+            with self.state.lock:
+                for release in self.state.releases.values():
+                    release["assets"] = [a for a in release["assets"] if a["id"] != asset_id]
+            return self.reply(204)
+        self.reply(404, {"message": "Not Found"})
+
+    def do_PUT(self):
+        if self.rate_limited():
+            return
+        # /artifactory/{repo}/{path...}
+        sha256 = self.headers.get('X-Checksum-Sha256')
+        if self.headers.get('X-Checksum-Deploy') == 'true':
+            self.read_stream()
+            return self.reply(201 if sha256 in self.state.artifacts else 404, {})
+        size, actual = self.read_stream()
+        if sha256 and sha256 != actual:
+            return self.reply(409, {"errors": [{"message": "Checksum mismatch"}]})
+        with self.state.lock:
+            self.state.artifacts[actual] = size
+        self.reply(201, {"size": size, "checksums": {"sha256": actual}})
+
+
+class MockServer:
+    def __init__(self, latency=0.0, bandwidth=None, rate_limit=None, secondary_rate=None):
+        self.state = MockState(latency, bandwidth, rate_limit, secondary_rate)
+        self.httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), MockHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.state = self.state
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
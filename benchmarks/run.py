@@ -0,0 +1,239 @@
+# End-to-end benchmark suite: compression throughput on synthetic trees and
+# upload throughput against a local stand-in for GitHub and Artifactory.
+#
+#   python -m benchmarks.run --output results.json
+#   python -m benchmarks.run --latency 0.05 --bandwidth 50 --compare results.json
+#
+# Every case runs in a fresh child process so its peak RSS is its own.
+# Results are written as JSON; --compare flags cases whose throughput dropped
+# or whose peak memory grew by more than --threshold against an earlier run,
+# and exits with status 1 when there is any.
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_compress import zipfile_baseline
+from benchmarks.bench_upload_memory import peak_rss_mib
+from benchmarks.mock_servers import MockServer
+from benchmarks.trees import MIB, PROFILES, generate_file, generate_tree
+
+RESULTS_VERSION = 1
+
+# Run in this order: later cases reuse what earlier ones left behind (the
+# previous archive for "rebuild", the uploaded asset for the "repeat" cases)
+UPLOAD_CASES = ["github", "github-repeat", "jfrog", "jfrog-repeat", "publish-everywhere"]
+
+
+def compression_cases(profiles):
+    cases = []
+    for profile in profiles:
+        cases += [f"zipfile:{profile}", f"compress:{profile}", f"rebuild:{profile}"]
+        # tar.zst needs the optional zstandard package
+        if importlib.util.find_spec("zstandard"):
+            cases.append(f"tar.zst:{profile}")
+    return cases
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_compression_case(kind, tree, zip_path):
+    from release_automation.archive import get_archive_writer
+    from release_automation.compression import compress_directory
+    from release_automation.manifest import manifest_path_for
+
+    if kind == "compress":
+        # A cold build: no previous archive or manifest to reuse
+        for path in (zip_path, manifest_path_for(zip_path)):
+            if os.path.exists(path):
+                os.remove(path)
+    start = time.perf_counter()
+    if kind == "zipfile":
+        zipfile_baseline(tree, zip_path)
+        stats = {}
+    elif kind == "tar.zst":
+        stats = get_archive_writer("tar.zst").write(tree, zip_path)
+    else:
+        # "rebuild" reuses the archive the compress case just wrote, with
+        # nothing changed in between
+        stats = compress_directory(tree, zip_path)
+    seconds = time.perf_counter() - start
+    return {"seconds": seconds, "bytes_out": os.path.getsize(zip_path), "reused": stats.get("reused", 0)}
+
+
+def run_upload_case(case, server_url, workdir, file_path):
+    from release_automation.github import GitHubUploader, build_release_data
+    from release_automation.jfrog import JFrogUploader
+    from release_automation.publish import publish_everywhere
+    from release_automation.release_index import ReleaseIndex
+
+    # A private index keeps the benchmark out of ~/.cache, while still letting
+    # the repeat case revalidate what the first GitHub case recorded
+    index = ReleaseIndex(os.path.join(workdir, "release_index.json"))
+    github = GitHubUploader("bench-token", "bench", "repo", index=index,
+                            api_url=server_url, uploads_url=server_url)
+    jfrog = JFrogUploader(server_url, "bench-token", "bench-local")
+
+    start = time.perf_counter()
+    if case in ("github", "github-repeat"):
+        uploaded = github.publish(build_release_data("v1.0.0"), file_path) is not None
+    elif case in ("jfrog", "jfrog-repeat"):
+        jfrog.upload_artifact(file_path)
+        uploaded = True
+    else:
+        data = build_release_data("v2.0.0")
+        results = publish_everywhere(file_path, {
+            "GitHub": lambda body: github.publish(data, file_path, body=body),
+            "JFrog": lambda body: jfrog.upload_artifact(file_path, body=body),
+        })
+        failed = [result.describe() for result in results if not result.ok]
+        if failed:
+            raise Exception("; ".join(failed))
+        uploaded = True
+    return {"seconds": time.perf_counter() - start, "uploaded": uploaded}
+
+
+def run_child(spec):
+    if spec["case"] in UPLOAD_CASES:
+        result = run_upload_case(spec["case"], spec["server"], spec["workdir"], spec["file"])
+    else:
+        kind, profile = spec["case"].split(":")
+        result = run_compression_case(kind, spec["tree"], spec["zip"])
+    result["peak_rss_mib"] = peak_rss_mib()
+    print(json.dumps(result))
+
+
+def run_case(spec):
+    completed = subprocess.run([sys.executable, '-m', 'benchmarks.run', '--child', json.dumps(spec)],
+                               capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise Exception(f"Benchmark case {spec['case']} failed:\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def run_suite(args):
+    cases = compression_cases(args.profiles) + (UPLOAD_CASES if not args.skip_uploads else [])
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp, \
+            MockServer(args.latency, args.bandwidth * MIB if args.bandwidth else None) as server:
+        trees = {}
+        for profile in args.profiles:
+            tree = os.path.join(tmp, profile)
+            files, total = generate_tree(tree, profile, args.scale)
+            trees[profile] = (tree, files, total)
+            print(f"{profile}: {files} files, {total / MIB:.1f} MiB", file=sys.stderr)
+        upload_file = os.path.join(tmp, "asset.bin")
+        generate_file(upload_file, args.upload_mib * MIB)
+        # publish-everywhere needs different content, or it would only
+        # confirm what the earlier cases uploaded
+        everywhere_file = os.path.join(tmp, "asset-everywhere.bin")
+        generate_file(everywhere_file, args.upload_mib * MIB, seed=1)
+
+        for case in cases:
+            spec = {"case": case, "server": server.url, "workdir": tmp}
+            if case in UPLOAD_CASES:
+                spec["file"] = everywhere_file if case == "publish-everywhere" else upload_file
+                bytes_in = args.upload_mib * MIB
+                info = {}
+            else:
+                kind, profile = case.split(":")
+                tree, files, bytes_in = trees[profile]
+                spec["tree"] = tree
+                # compress and rebuild share one archive; the others get their own
+                name = {"zipfile": f"{profile}-zipfile.zip", "tar.zst": f"{profile}.tar.zst"}.get(
+                    kind, f"{profile}.zip")
+                spec["zip"] = os.path.join(tmp, name)
+                info = {"files": files}
+            result = run_case(spec)
+            result.update(info, bytes_in=bytes_in,
+                          mb_per_s=bytes_in / MIB / result["seconds"] if result["seconds"] else None)
+            results[case] = result
+            print(f"{case:>24}  {result['seconds']:>8.2f}s  {result['mb_per_s'] or 0:>8.1f} MB/s  "
+                  f"{result['peak_rss_mib']:>7.1f} MiB peak", file=sys.stderr)
+        requests_made, bytes_received = server.state.requests, server.state.bytes_received
+
+    return {
+        "version": RESULTS_VERSION,
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "config": {
+            "profiles": args.profiles, "scale": args.scale, "upload_mib": args.upload_mib,
+            "latency": args.latency, "bandwidth_mib_s": args.bandwidth,
+        },
+        "server": {"requests": requests_made, "bytes_received": bytes_received},
+        "results": results,
+    }
+
+
+def compare(baseline, current, threshold):
+    # Returns a line per regressed case. Throughput must not drop, and peak
+    # memory must not grow, by more than threshold (a fraction).
+    regressions = []
+    if baseline.get("config") != current["config"]:
+        print("warning: baseline was recorded with a different configuration", file=sys.stderr)
+    for case, result in current["results"].items():
+        before = baseline.get("results", {}).get(case)
+        if not before:
+            continue
+        if before.get("mb_per_s") and result["mb_per_s"] < before["mb_per_s"] * (1 - threshold):
+            regressions.append(f"{case}: {before['mb_per_s']:.1f} -> {result['mb_per_s']:.1f} MB/s")
+        if result["peak_rss_mib"] > before["peak_rss_mib"] * (1 + threshold):
+            regressions.append(f"{case}: peak RSS {before['peak_rss_mib']:.1f} -> "
+                               f"{result['peak_rss_mib']:.1f} MiB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Packaging and upload benchmarks")
+    parser.add_argument('--profiles', nargs='+', choices=sorted(PROFILES), default=sorted(PROFILES))
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help="Multiplies the file count of every tree profile")
+    parser.add_argument('--upload-mib', type=int, default=64, help="Size of the uploaded asset")
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help="Seconds the stand-in server adds to every response")
+    parser.add_argument('--bandwidth', type=float, help="Upload bandwidth of the stand-in server, MiB/s")
+    parser.add_argument('--skip-uploads', action='store_true')
+    parser.add_argument('--output', help="Write the results to this JSON file")
+    parser.add_argument('--compare', metavar='BASELINE', help="Results JSON of an earlier run")
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help="Allowed slowdown or memory growth before a case counts as a regression")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(json.loads(args.child))
+        return 0
+
+    results = run_suite(args)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, results, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
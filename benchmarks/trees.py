@@ -0,0 +1,61 @@
+# Synthetic directory trees for the packaging benchmarks. Content is seeded,
+# so the same profile and scale always produce byte-identical trees.
+import os
+import random
+
+KIB = 1024
+MIB = 1024 * KIB
+
+WORDS = [b'release', b'artifact', b'build', b'module', b'config', b'asset', b'\n']
+
+# name -> (file count, min size, max size, fraction of incompressible files);
+# file counts are multiplied by --scale
+PROFILES = {
+    # A build output with lots of small sources and metadata files
+    "tiny": (5000, 256, 4 * KIB, 0.1),
+    # A handful of large binaries
+    "huge": (4, 32 * MIB, 64 * MIB, 0.5),
+    # Mixed compressible text, random data and already-compressed files
+    "mixed": (800, 4 * KIB, 512 * KIB, 0.5),
+}
+
+
+def text_bytes(rng, size):
+    data = b' '.join(rng.choice(WORDS) for _ in range(size // 6 + 1))
+    return data[:size]
+
+
+def write_data(path, rng, size, incompressible):
+    # Written in 1 MiB pieces so large files do not inflate the generating
+    # process's memory (children inherit its peak RSS)
+    with open(path, 'wb') as f:
+        remaining = size
+        while remaining:
+            piece = min(remaining, MIB)
+            f.write(rng.randbytes(piece) if incompressible else text_bytes(rng, piece))
+            remaining -= piece
+
+
+def generate_tree(root, profile="mixed", scale=1.0, seed=0):
+    # Writes the tree under root and returns (file count, total bytes)
+    count, min_size, max_size, incompressible = PROFILES[profile]
+    count = max(1, int(count * scale))
+    rng = random.Random(seed)
+    total = 0
+    for i in range(count):
+        subdir = os.path.join(root, f"dir{i % 32}", f"sub{i % 7}")
+        os.makedirs(subdir, exist_ok=True)
+        size = rng.randint(min_size, max_size)
+        if rng.random() < incompressible:
+            # Some random files carry an extension that is stored, not deflated
+            name = f"file{i}.png" if i % 2 else f"file{i}.bin"
+            write_data(os.path.join(subdir, name), rng, size, True)
+        else:
+            write_data(os.path.join(subdir, f"file{i}.txt"), rng, size, False)
+        total += size
+    return count, total
+
+
+def generate_file(path, size, seed=0):
+    # One incompressible file of the given size
+    write_data(path, random.Random(seed), size, True)
@@ -0,0 +1,58 @@
+import importlib
+
+# Public names are resolved on first access so that importing the package (or
+# running the CLI) only loads the modules a command actually uses. In
+# particular nothing here pulls in Tk or requests up front.
+_EXPORTS = {
+    "ARCHIVE_WRITERS": "archive",
+    "VolumeWriter": "archive",
+    "build_archive": "archive",
+    "checksums_for": "archive",
+    "get_archive_writer": "archive",
+    "join_volumes": "archive",
+    "split_volumes": "archive",
+    "BatchRelease": "batch",
+    "BatchResult": "batch",
+    "load_batch_manifest": "batch",
+    "run_batch": "batch",
+    "HashingWriter": "checksums",
+    "write_sha256sums": "checksums",
+    "STORED_EXTENSIONS": "compression",
+    "ZipStreamWriter": "compression",
+    "compress_directory": "compression",
+    "stream_directory": "compression",
+    "GitHubUploader": "github",
+    "build_release_data": "github",
+    "RateLimiter": "http",
+    "RetryPolicy": "http",
+    "SessionPool": "http",
+    "JFrogUploader": "jfrog",
+    "Job": "jobs",
+    "JobCancelled": "jobs",
+    "JobScheduler": "jobs",
+    "ProgressEvent": "jobs",
+    "MetricsRecorder": "metrics",
+    "default_recorder": "metrics",
+    "PublishResult": "publish",
+    "publish_assets": "publish",
+    "publish_everywhere": "publish",
+    "publish_streaming": "publish",
+    "DEFAULT_EXCLUDES": "scanner",
+    "IgnoreRules": "scanner",
+    "load_ignore_rules": "scanner",
+    "scan_directory": "scanner",
+    "DEFAULT_CHUNK_SIZE": "streaming",
+    "ChunkBroadcaster": "streaming",
+    "ChunkedFileReader": "streaming",
+    "PipeWriter": "streaming",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,378 @@
+import glob
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import stat
+import tarfile
+
+from .checksums import SHA256SUMS_NAME, HashingReader, HashingWriter, file_digests
+from .compression import READ_CHUNK_SIZE, STORED_EXTENSIONS, compress_directory, stream_directory
+from .manifest import load_archive_digests, save_manifest
+from .metrics import span
+from .scanner import scan_directory
+
+# GitHub rejects release assets of 2 GiB or more
+GITHUB_MAX_ASSET_SIZE = 2 * 1024 ** 3
+# Volumes stay a little under the limit
+DEFAULT_VOLUME_SIZE = GITHUB_MAX_ASSET_SIZE - 64 * 1024 * 1024
+
+# release.tar.zst -> release.tar.zst.001, .002, ... + release.tar.zst.volumes.json
+VOLUMES_SUFFIX = '.volumes.json'
+VOLUMES_VERSION = 1
+
+DEFAULT_ZIP_LEVEL = 6
+DEFAULT_ZSTD_LEVEL = 3
+
+
+class ZipArchiveWriter:
+    # Parallel deflate with incremental rebuilds, see compress_directory
+    extension = '.zip'
+    content_type = 'application/zip'
+
+    def __init__(self, level=None, workers=None, incremental=True, store_extensions=STORED_EXTENSIONS,
+                 ignore=None):
+        self.level = DEFAULT_ZIP_LEVEL if level is None else level
+        if not 0 <= self.level <= 9:
+            raise Exception(f"ZIP compression level must be between 0 and 9, not {self.level}")
+        self.workers = workers
+        self.incremental = incremental
+        self.store_extensions = store_extensions
+        self.ignore = ignore
+
+    def write(self, directory, archive_path, progress=None):
+        return compress_directory(directory, archive_path, workers=self.workers, compresslevel=self.level,
+                                  store_extensions=self.store_extensions, incremental=self.incremental,
+                                  progress=progress, ignore=self.ignore)
+
+    def write_stream(self, directory, fileobj, progress=None):
+        return stream_directory(directory, fileobj, workers=self.workers, compresslevel=self.level,
+                                store_extensions=self.store_extensions, progress=progress, ignore=self.ignore)
+
+
+class TarZstdArchiveWriter:
+    # A tar stream compressed by zstd's own worker threads. Needs the
+    # zstandard package (pip install zstandard).
+    extension = '.tar.zst'
+    content_type = 'application/zstd'
+
+    def __init__(self, level=None, workers=None, ignore=None):
+        self.level = DEFAULT_ZSTD_LEVEL if level is None else level
+        if not 1 <= self.level <= 22:
+            raise Exception(f"zstd compression level must be between 1 and 22, not {self.level}")
+        self.workers = workers or os.cpu_count() or 1
+        self.ignore = ignore
+
+    def write(self, directory, archive_path, progress=None):
+        # Like the ZIP writer, leaves a manifest with the SHA-256 of every
+        # member and the digests of the archive, all taken while writing
+        partial_path = archive_path + '.partial'
+        try:
+            with open(partial_path, 'wb') as f:
+                output = HashingWriter(f)
+                stats, members = self.write_tar(directory, output, progress)
+        except BaseException:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            raise
+        os.replace(partial_path, archive_path)
+        stats["digests"] = output.hexdigests()
+        save_manifest(archive_path, self.level, members, stats["digests"])
+        return stats
+
+    def write_stream(self, directory, fileobj, progress=None):
+        # The tar stream never seeks, so fileobj may be a pipe or socket
+        return self.write_tar(directory, fileobj, progress)[0]
+
+    def write_tar(self, directory, fileobj, progress=None):
+        # Returns (stats, manifest members)
+        try:
+            import zstandard
+        except ImportError:
+            raise Exception("The zstandard package is required for tar.zst archives (pip install zstandard)")
+
+        entries = scan_directory(directory, self.ignore)
+        bytes_total = sum(entry.size for entry in entries)
+        stats = {"files": 0, "reused": 0, "bytes_in": 0, "bytes_out": 0}
+        members = []
+        compressor = zstandard.ZstdCompressor(level=self.level, threads=self.workers, write_checksum=True)
+        with span("compress", format="tar.zst") as compress_span:
+            with compressor.stream_writer(fileobj, size=-1, closefd=False) as zstd_stream, \
+                    tarfile.open(fileobj=zstd_stream, mode='w|', format=tarfile.PAX_FORMAT,
+                                 copybufsize=READ_CHUNK_SIZE) as tar:
+                for entry in entries:
+                    # Built from the scan instead of gettarinfo(), which would
+                    # stat the file again and look up its owner by name
+                    tarinfo = tarfile.TarInfo(entry.arcname)
+                    tarinfo.size = entry.size
+                    tarinfo.mtime = entry.mtime
+                    tarinfo.mode = stat.S_IMODE(entry.mode)
+                    with open(entry.path, 'rb') as f:
+                        member = HashingReader(f)
+                        tar.addfile(tarinfo, member)
+                    members.append({"path": entry.arcname, "size": entry.size, "mtime_ns": entry.mtime_ns,
+                                    "sha256": member.hexdigest()})
+                    stats["files"] += 1
+                    stats["bytes_in"] += entry.size
+                    if progress:
+                        progress(stats["bytes_in"], bytes_total)
+            stats["bytes_out"] = compressor.frame_progression()[2]
+            compress_span.set(files=stats["files"], reused=0, bytes=stats["bytes_in"],
+                              bytes_out=stats["bytes_out"])
+        return stats, members
+
+
+ARCHIVE_WRITERS = {
+    "zip": ZipArchiveWriter,
+    "tar.zst": TarZstdArchiveWriter,
+}
+
+
+def get_archive_writer(archive_format="zip", level=None, workers=None, **options):
+    if archive_format not in ARCHIVE_WRITERS:
+        raise Exception(f"Unknown archive format '{archive_format}', "
+                        f"expected one of: {', '.join(ARCHIVE_WRITERS)}")
+    return ARCHIVE_WRITERS[archive_format](level=level, workers=workers, **options)
+
+
+def archive_path_for(directory, archive_format="zip", output_dir=None):
+    name = os.path.basename(directory.rstrip('/\\')) + ARCHIVE_WRITERS[archive_format].extension
+    return os.path.join(output_dir or os.getcwd(), name)
+
+
+def volumes_path_for(archive_path):
+    return archive_path + VOLUMES_SUFFIX
+
+
+def remove_volumes(archive_path):
+    for path in glob.glob(glob.escape(archive_path) + '.[0-9][0-9][0-9]'):
+        os.remove(path)
+    if os.path.exists(volumes_path_for(archive_path)):
+        os.remove(volumes_path_for(archive_path))
+
+
+class VolumeWriter:
+    # Write-only file object that cuts what is written into archive.001,
+    # archive.002, ... of volume_size bytes as it arrives, with the SHA-1 and
+    # SHA-256 of each, and on close writes archive.volumes.json. An archive
+    # that fits in one volume ends up as archive_path itself. Spooling a
+    # streamed archive through it splits it without a second copy on disk.
+    def __init__(self, archive_path, volume_size=DEFAULT_VOLUME_SIZE):
+        remove_volumes(archive_path)
+        self.archive_path = archive_path
+        self.volume_size = volume_size
+        self.archive_digest = hashlib.sha256()
+        self.volumes = []
+        self.file = None
+        self.digests = None
+        # Bytes in the current volume, and in all of them
+        self.written = 0
+        self.size = 0
+        # Once closed: the paths to upload, and their {path: digests}
+        self.assets = None
+        self.checksums = {}
+
+    def writable(self):
+        return True
+
+    def tell(self):
+        return self.size
+
+    def flush(self):
+        if self.file:
+            self.file.flush()
+
+    def write(self, data):
+        view = memoryview(data)
+        while view:
+            if self.file is None or self.written == self.volume_size:
+                self._next_volume()
+            chunk = view[:self.volume_size - self.written]
+            self.file.write(chunk)
+            self.archive_digest.update(chunk)
+            for digest in self.digests.values():
+                digest.update(chunk)
+            self.written += len(chunk)
+            self.size += len(chunk)
+            view = view[len(chunk):]
+        return len(data)
+
+    def _next_volume(self):
+        self._finish_volume()
+        self.file = open(f"{self.archive_path}.{len(self.volumes) + 1:03d}", 'wb')
+        self.digests = {'sha1': hashlib.sha1(), 'sha256': hashlib.sha256()}
+        self.written = 0
+
+    def _finish_volume(self):
+        if self.file is None:
+            return
+        self.file.close()
+        # SHA-1 too, so Artifactory can be sent both checksums without
+        # reading the volume again
+        self.volumes.append({"name": os.path.basename(self.file.name), "size": self.written,
+                             "sha256": self.digests['sha256'].hexdigest(), "sha1": self.digests['sha1'].hexdigest()})
+        self.file = None
+
+    def close(self):
+        if self.assets is not None:
+            return
+        self._finish_volume()
+        directory = os.path.dirname(self.archive_path)
+        if len(self.volumes) <= 1:
+            if self.volumes:
+                os.replace(f"{self.archive_path}.001", self.archive_path)
+                volume = self.volumes[0]
+            else:
+                open(self.archive_path, 'wb').close()
+                volume = {"sha1": hashlib.sha1().hexdigest(), "sha256": hashlib.sha256().hexdigest()}
+            self.assets = [self.archive_path]
+            self.checksums = {self.archive_path: {"sha1": volume["sha1"], "sha256": volume["sha256"]}}
+            return
+
+        manifest = {
+            "version": VOLUMES_VERSION,
+            "archive": os.path.basename(self.archive_path),
+            "size": self.size,
+            "sha256": self.archive_digest.hexdigest(),
+            "volume_size": self.volume_size,
+            # Volumes are plain byte ranges: "cat name.001 name.002 ... > name"
+            # also reassembles them
+            "volumes": self.volumes,
+        }
+        with open(volumes_path_for(self.archive_path), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        logging.info(f"Split '{os.path.basename(self.archive_path)}' into {len(self.volumes)} volumes of "
+                     f"up to {self.volume_size / (1024 * 1024):.0f} MiB")
+        volume_paths = [os.path.join(directory, volume["name"]) for volume in self.volumes]
+        self.assets = volume_paths + [volumes_path_for(self.archive_path)]
+        self.checksums = {path: {"sha1": volume["sha1"], "sha256": volume["sha256"]}
+                          for path, volume in zip(volume_paths, self.volumes)}
+
+
+def split_volumes(archive_path, volume_size=DEFAULT_VOLUME_SIZE, progress=None):
+    # Cuts the archive into archive.001, archive.002, ... of volume_size bytes
+    # and writes archive.volumes.json to reassemble and verify them. Returns
+    # the paths to upload: the volumes and the reassembly manifest, or just
+    # the archive when it fits in one volume. The archive itself is kept as
+    # the base for the next incremental build.
+    remove_volumes(archive_path)
+    archive_size = os.path.getsize(archive_path)
+    if archive_size <= volume_size:
+        return [archive_path]
+
+    volumes = VolumeWriter(archive_path, volume_size)
+    with open(archive_path, 'rb') as src:
+        while True:
+            chunk = src.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            volumes.write(chunk)
+            if progress:
+                progress(volumes.tell(), archive_size)
+    volumes.close()
+    return volumes.assets
+
+
+def archive_assets(archive_path):
+    # The files to upload for an archive: its volumes and their manifest when
+    # split_volumes produced them from this very archive, otherwise the
+    # archive itself
+    volumes_path = volumes_path_for(archive_path)
+    if os.path.exists(volumes_path):
+        try:
+            with open(volumes_path, 'r') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable volume manifest '{volumes_path}': {e}")
+            manifest = None
+        directory = os.path.dirname(archive_path)
+        if (manifest and manifest.get("version") == VOLUMES_VERSION
+                and (not os.path.exists(archive_path) or manifest["size"] == os.path.getsize(archive_path))
+                and all(os.path.exists(os.path.join(directory, v["name"])) for v in manifest["volumes"])):
+            return [os.path.join(directory, volume["name"]) for volume in manifest["volumes"]] + [volumes_path]
+    return [archive_path]
+
+
+def join_volumes(volumes_path, output_path=None):
+    # Reassembles the archive described by a .volumes.json manifest next to
+    # its volumes, verifying every volume and the result
+    with open(volumes_path, 'r') as f:
+        manifest = json.load(f)
+    directory = os.path.dirname(os.path.abspath(volumes_path))
+    output_path = output_path or os.path.join(directory, manifest["archive"])
+    archive_digest = hashlib.sha256()
+    with open(output_path + '.partial', 'wb') as dst:
+        for volume in manifest["volumes"]:
+            volume_digest = hashlib.sha256()
+            with open(os.path.join(directory, volume["name"]), 'rb') as src:
+                while True:
+                    chunk = src.read(READ_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    volume_digest.update(chunk)
+                    archive_digest.update(chunk)
+                    dst.write(chunk)
+            if volume_digest.hexdigest() != volume["sha256"]:
+                os.remove(output_path + '.partial')
+                raise Exception(f"Volume '{volume['name']}' is corrupt (SHA-256 mismatch)")
+    if archive_digest.hexdigest() != manifest["sha256"]:
+        os.remove(output_path + '.partial')
+        raise Exception(f"Reassembled '{manifest['archive']}' does not match its SHA-256")
+    os.replace(output_path + '.partial', output_path)
+    return output_path
+
+
+def build_archive(directory, archive_path, archive_format="zip", level=None, workers=None,
+                  volume_size=DEFAULT_VOLUME_SIZE, incremental=True, progress=None, ignore=None):
+    # Packages directory with the chosen writer and splits the result into
+    # volumes when it is larger than volume_size. Returns (assets, stats),
+    # assets being the files to upload in order. ignore is an IgnoreRules,
+    # see load_ignore_rules.
+    options = {"incremental": incremental} if archive_format == "zip" else {}
+    writer = get_archive_writer(archive_format, level=level, workers=workers, ignore=ignore, **options)
+    stats = writer.write(directory, archive_path, progress=progress)
+    if volume_size:
+        assets = split_volumes(archive_path, volume_size)
+    else:
+        remove_volumes(archive_path)
+        assets = [archive_path]
+    stats["volumes"] = len(assets) - 1 if len(assets) > 1 else 0
+    return assets, stats
+
+
+def asset_checksums(file_path, known=None):
+    # SHA-1 and SHA-256 of an asset to upload, taken from what was recorded
+    # while it was written: known (a {path: digests} mapping), the archive's
+    # manifest, or for a volume the .volumes.json of its archive. Anything
+    # else is read and hashed.
+    if known and file_path in known:
+        return known[file_path]
+    digests = load_archive_digests(file_path)
+    if digests:
+        return digests
+    archive_path, _, number = file_path.rpartition('.')
+    if number.isdigit() and os.path.exists(volumes_path_for(archive_path)):
+        try:
+            with open(volumes_path_for(archive_path), 'r') as f:
+                volumes = json.load(f)["volumes"]
+        except (OSError, ValueError, KeyError):
+            volumes = []
+        for volume in volumes:
+            if (volume.get("name") == os.path.basename(file_path) and "sha1" in volume
+                    and volume["size"] == os.path.getsize(file_path)):
+                return {"sha1": volume["sha1"], "sha256": volume["sha256"]}
+    return file_digests(file_path, ('sha1', 'sha256'))
+
+
+def checksums_for(file_paths, known=None):
+    return {file_path: asset_checksums(file_path, known) for file_path in file_paths}
+
+
+def asset_content_type(file_path):
+    if os.path.basename(file_path) == SHA256SUMS_NAME:
+        return 'text/plain'
+    for writer in ARCHIVE_WRITERS.values():
+        if file_path.endswith(writer.extension):
+            return writer.content_type
+    return mimetypes.guess_type(file_path)[0] or 'application/octet-stream'
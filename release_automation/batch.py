@@ -0,0 +1,179 @@
+import glob
+import json
+import logging
+import mimetypes
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .github import GITHUB_API_URL, GitHubUploader, build_release_data
+from .http import DEFAULT_RATE, SessionPool, describe_budget
+
+DEFAULT_CONCURRENCY = 4
+
+# Release metadata a batch manifest may set, per release or under "defaults"
+RELEASE_FIELDS = (
+    "name", "body", "target_commitish", "prerelease", "discussion_category_name",
+    "generate_release_notes", "make_latest",
+)
+
+
+class BatchRelease:
+    def __init__(self, repo, tag, assets, release_data):
+        self.repo = repo
+        self.tag = tag
+        # Absolute paths of the files to upload
+        self.assets = assets
+        self.release_data = release_data
+
+
+class BatchResult:
+    def __init__(self, release, ok, uploaded=(), skipped=(), bytes_sent=0, seconds=0.0, error=None):
+        self.release = release
+        self.ok = ok
+        self.uploaded = list(uploaded)
+        # Assets already present with identical content
+        self.skipped = list(skipped)
+        self.bytes_sent = bytes_sent
+        self.seconds = seconds
+        self.error = error
+
+
+def read_manifest_file(path):
+    with open(path, "r") as f:
+        if path.endswith((".yml", ".yaml")):
+            try:
+                import yaml
+            except ImportError:
+                raise Exception("PyYAML is required for YAML batch manifests (pip install pyyaml)")
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def load_batch_manifest(path):
+    # A manifest looks like:
+    #
+    #   {"defaults": {"target_commitish": "main"},
+    #    "releases": [{"repo": "owner/name", "tag": "v1.2.0", "name": "...",
+    #                  "assets": ["dist/*.zip"]}]}
+    #
+    # Asset globs are relative to the manifest's directory.
+    manifest = read_manifest_file(path)
+    base_dir = os.path.dirname(os.path.abspath(path))
+    defaults = manifest.get("defaults", {})
+    releases = []
+    for index, entry in enumerate(manifest.get("releases", []), start=1):
+        entry = dict(defaults, **entry)
+        repo, tag = entry.get("repo"), entry.get("tag")
+        if not repo or repo.count("/") != 1 or not tag:
+            raise Exception(f"Release #{index} in '{path}' needs 'repo' (OWNER/REPO) and 'tag'")
+
+        patterns = entry.get("assets", [])
+        if isinstance(patterns, str):
+            patterns = [patterns]
+        assets = []
+        for pattern in patterns:
+            matches = sorted(glob.glob(os.path.join(base_dir, pattern), recursive=True))
+            assets.extend(match for match in matches if os.path.isfile(match) and match not in assets)
+        if patterns and not assets:
+            raise Exception(f"No files match the assets of {repo}@{tag}: {', '.join(patterns)}")
+
+        metadata = {field: entry[field] for field in RELEASE_FIELDS if field in entry}
+        releases.append(BatchRelease(repo, tag, assets, build_release_data(tag, **metadata)))
+    return releases
+
+
+class BatchProgress:
+    # Folds the per-asset progress callbacks of concurrent uploads into a
+    # single progress(bytes_done, bytes_total) for the whole batch
+    def __init__(self, bytes_total, callback):
+        self.bytes_total = bytes_total
+        self.callback = callback
+        self.bytes_done = 0
+        self.lock = threading.Lock()
+
+    def for_asset(self):
+        last = [0]
+
+        def report(sent, size):
+            with self.lock:
+                self.bytes_done += sent - last[0]
+                last[0] = sent
+                bytes_done = self.bytes_done
+            self.callback(bytes_done, self.bytes_total)
+        return report
+
+    def skip(self, size):
+        # Skipped assets count as done so the total still adds up
+        self.for_asset()(size, size)
+
+
+def publish_release(release, gh_token, sessions, progress=None):
+    start = time.monotonic()
+    uploaded = []
+    skipped = []
+    bytes_sent = 0
+    try:
+        owner, repo = release.repo.split("/")
+        uploader = GitHubUploader(gh_token, owner, repo, sessions=sessions)
+        github_release = uploader.release_for(release.release_data)
+        for asset in release.assets:
+            content_type = mimetypes.guess_type(asset)[0] or "application/octet-stream"
+            # On a re-run only missing or changed assets are sent
+            if uploader.publish_asset(github_release, asset, content_type=content_type,
+                                      progress=progress.for_asset() if progress else None):
+                uploaded.append(os.path.basename(asset))
+                bytes_sent += os.path.getsize(asset)
+            else:
+                skipped.append(os.path.basename(asset))
+                if progress:
+                    progress.skip(os.path.getsize(asset))
+        # The digests of every asset are in the release index by now, taken
+        # while uploading or while checking that an asset was up to date
+        uploader.publish_checksums(release.release_data)
+    except Exception as e:
+        logging.error(f"Release {release.repo}@{release.tag} failed: {e}")
+        return BatchResult(release, False, uploaded, skipped, bytes_sent, time.monotonic() - start, e)
+    return BatchResult(release, True, uploaded, skipped, bytes_sent, time.monotonic() - start)
+
+
+def run_batch(releases, gh_token, concurrency=DEFAULT_CONCURRENCY, progress=None, rate=None):
+    # Publishes every release through a bounded pool. All workers share one
+    # keep-alive session per host, sized to the pool, and with it the rate
+    # limiter: at most rate requests per second go to each host, and a rate
+    # limit response pauses every worker rather than just the one that hit it.
+    sessions = SessionPool(pool_size=concurrency, rate=rate or DEFAULT_RATE)
+    batch_progress = None
+    if progress:
+        bytes_total = sum(os.path.getsize(asset) for release in releases for asset in release.assets)
+        batch_progress = BatchProgress(bytes_total, progress)
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch") as pool:
+            futures = [pool.submit(publish_release, release, gh_token, sessions, batch_progress)
+                       for release in releases]
+            results = [future.result() for future in futures]
+        logging.info(f"GitHub API budget: {describe_budget(sessions.budget(GITHUB_API_URL))}")
+        return results
+    finally:
+        sessions.close()
+
+
+def format_summary(results):
+    rows = [("REPO", "TAG", "STATUS", "ASSETS", "SKIPPED", "MiB", "SECONDS")]
+    for result in results:
+        status = "ok" if result.ok else f"failed: {result.error}"
+        rows.append((
+            result.release.repo, result.release.tag, status,
+            f"{len(result.uploaded)}/{len(result.release.assets)}", str(len(result.skipped)),
+            f"{result.bytes_sent / (1024 * 1024):.1f}", f"{result.seconds:.1f}",
+        ))
+    # The status column may be long, so it is left unpadded at the end
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    lines = []
+    for repo, tag, status, assets, skipped, mib, seconds in rows:
+        lines.append(f"{repo:<{widths[0]}}  {tag:<{widths[1]}}  {assets:>{widths[3]}}  {skipped:>{widths[4]}}  "
+                     f"{mib:>{widths[5]}}  {seconds:>{widths[6]}}  {status}")
+    ok = sum(1 for result in results if result.ok)
+    lines.append(f"{ok} of {len(results)} releases published")
+    return "\n".join(lines)
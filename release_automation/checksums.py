@@ -0,0 +1,94 @@
+import hashlib
+import os
+
+from .metrics import span
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Uploaded to GitHub next to the release assets, in sha256sum's format
+SHA256SUMS_NAME = 'SHA256SUMS'
+
+
+def file_digests(file_path, algorithms=('sha1', 'sha256'), record=True):
+    # Hashes a file with several algorithms in a single streaming pass. Each
+    # call is recorded as a "hash" span unless record=False, for callers that
+    # hash many files and account for it in their own span.
+    if not record:
+        return _file_digests(file_path, algorithms)[0]
+    with span("hash", algorithms=",".join(algorithms)) as hash_span:
+        digests, size = _file_digests(file_path, algorithms)
+        hash_span.set(bytes=size)
+    return digests
+
+
+def _file_digests(file_path, algorithms):
+    digests = {name: hashlib.new(name) for name in algorithms}
+    size = 0
+    with open(file_path, 'rb') as f:
+        while True:
+            chunk = f.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            for digest in digests.values():
+                digest.update(chunk)
+    return {name: digest.hexdigest() for name, digest in digests.items()}, size
+
+
+def file_sha256(file_path, record=True):
+    return file_digests(file_path, ('sha256',), record)['sha256']
+
+
+def write_sha256sums(sums, directory):
+    # Writes directory/SHA256SUMS from a {asset name: sha256} mapping, sorted
+    # by name so that the same assets always give the same file, for
+    # "sha256sum -c SHA256SUMS" after download. Returns its path.
+    sums_path = os.path.join(directory, SHA256SUMS_NAME)
+    with open(sums_path + '.tmp', 'w', newline='\n') as f:
+        for name, sha256 in sorted(sums.items()):
+            f.write(f"{sha256}  {name}\n")
+    os.replace(sums_path + '.tmp', sums_path)
+    return sums_path
+
+
+class HashingWriter:
+    # Write-through wrapper that hashes everything written to fileobj, so an
+    # archive's digests are ready the moment it is written instead of costing
+    # another full read
+    def __init__(self, fileobj, algorithms=('sha1', 'sha256')):
+        self.fileobj = fileobj
+        self.digests = {name: hashlib.new(name) for name in algorithms}
+        self.size = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        for digest in self.digests.values():
+            digest.update(data)
+        self.size += len(data)
+        return self.fileobj.write(data)
+
+    def tell(self):
+        return self.size
+
+    def flush(self):
+        self.fileobj.flush()
+
+    def hexdigests(self):
+        return {name: digest.hexdigest() for name, digest in self.digests.items()}
+
+
+class HashingReader:
+    # Read-through counterpart, for hashing a file while it is copied
+    def __init__(self, fileobj, algorithm='sha256'):
+        self.fileobj = fileobj
+        self.digest = hashlib.new(algorithm)
+
+    def read(self, size=-1):
+        data = self.fileobj.read(size)
+        self.digest.update(data)
+        return data
+
+    def hexdigest(self):
+        return self.digest.hexdigest()
@@ -0,0 +1,376 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+# Keep this module's imports to the standard library: pipeline modules (and
+# requests) are imported by the command that needs them, and Tk only by "gui".
+
+# Environment variables used when tokens are not passed on the command line
+GITHUB_TOKEN_ENV = "GITHUB_TOKEN"
+JFROG_TOKEN_ENV = "JFROG_TOKEN"
+
+
+class ProgressPrinter:
+    # Progress callback that prints throughput to stderr at most twice a second
+    def __init__(self, stage, stream=sys.stderr, interval=0.5):
+        self.stage = stage
+        self.stream = stream
+        self.interval = interval
+        self.started = time.monotonic()
+        self.last = 0.0
+
+    def __call__(self, bytes_done, bytes_total=None):
+        now = time.monotonic()
+        if now - self.last < self.interval and bytes_done != bytes_total:
+            return
+        self.last = now
+        mib = 1024 * 1024
+        elapsed = now - self.started
+        rate = bytes_done / elapsed / mib if elapsed > 0 else 0.0
+        total = f" / {bytes_total / mib:.1f}" if bytes_total else ""
+        self.stream.write(f"\r{self.stage}: {bytes_done / mib:.1f}{total} MiB, {rate:.1f} MiB/s")
+        if bytes_done == bytes_total:
+            self.stream.write("\n")
+        self.stream.flush()
+
+
+def load_config_defaults(config_path):
+    # The GUI's config.json can supply defaults for anything not given on the
+    # command line
+    if not config_path:
+        return {}
+    with open(config_path, "r") as f:
+        config = json.load(f)
+    return {
+        "gh_token": config.get("gh_token") or None,
+        "github": (f"{config['repo_owner']}/{config['repo_name']}"
+                   if config.get("repo_owner") and config.get("repo_name") else None),
+        "tag": config.get("release_tag") or None,
+        "name": config.get("release_name") or None,
+        "body": config.get("release_description") or None,
+        "target": config.get("target_commitish") or None,
+        "discussion_category": config.get("discussion_category_name") or None,
+        "generate_release_notes": config.get("generate_release_notes", False),
+        "make_latest": config.get("make_latest") or None,
+        "prerelease": config.get("is_prerelease", False),
+        "jfrog_token": config.get("jfrog_token") or None,
+        "jfrog": config.get("jfrog_url") or None,
+        "jfrog_repo": config.get("jfrog_repo") or None,
+        "format": config.get("archive_format") or None,
+    }
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m release_automation",
+        description="Package a directory and publish it to GitHub Releases and/or JFrog Artifactory.",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    # Shared by the commands that run the pipeline
+    metrics = argparse.ArgumentParser(add_help=False)
+    telemetry = metrics.add_argument_group("Metrics")
+    telemetry.add_argument("--metrics-jsonl", metavar="FILE",
+                           help="Append one JSON line per pipeline stage (scan, compress, hash, release, "
+                                "github_upload, jfrog_deploy) with duration, bytes, throughput, retries "
+                                "and HTTP status")
+    telemetry.add_argument("--metrics-prom", metavar="FILE",
+                           help="Write per-stage totals in Prometheus text format, e.g. for "
+                                "node_exporter's textfile collector")
+    telemetry.add_argument("--profile", metavar="FILE", help="Write a cProfile dump of the run (pstats format)")
+
+    publish = subparsers.add_parser("publish", parents=[metrics], help="Compress and upload without the GUI")
+    publish.add_argument("--config", help="Read defaults from a config.json saved by the GUI")
+    publish.add_argument("--dir", help="Directory to compress")
+    publish.add_argument("--archive", "--zip", dest="zip",
+                         help="Archive to upload; written here when --dir is given, only its name "
+                              "is used with --stream (default: ./<dirname>.zip or ./<dirname>.tar.zst)")
+    publish.add_argument("--format", choices=["zip", "tar.zst"],
+                         help="Archive format written from --dir (default: zip; tar.zst needs the "
+                              "zstandard package)")
+    publish.add_argument("--level", type=int,
+                         help="Compression level (zip: 0-9, default 6; tar.zst: 1-22, default 3)")
+    publish.add_argument("--workers", type=int, help="Compression threads (default: CPU count)")
+    publish.add_argument("--no-incremental", action="store_true",
+                         help="Recompress every file instead of reusing the previous archive (zip only)")
+    publish.add_argument("--stream", action="store_true",
+                         help="Pipe the archive from --dir straight into the uploads instead of "
+                              "writing it to disk first (JFrog is streamed, GitHub gets one spooled copy)")
+    publish.add_argument("--spool-dir", help="Where --stream spools the copy GitHub needs "
+                                             "(default: the system temp directory)")
+    publish.add_argument("--volume-size", type=int, metavar="MIB",
+                         help="Split archives larger than this into numbered volumes plus a "
+                              ".volumes.json manifest (default: just under GitHub's 2 GiB asset "
+                              "limit; 0 disables splitting)")
+
+    files = publish.add_argument_group(
+        "Files", "Which files of --dir are archived, in .gitignore syntax. A .releaseignore file at the "
+                 "root of --dir is read too; VCS metadata, node_modules and build caches are left out "
+                 "by default.")
+    files.add_argument("--exclude", action="append", default=[], metavar="PATTERN",
+                       help="Leave out matching files and directories (repeatable)")
+    files.add_argument("--include", action="append", default=[], metavar="PATTERN",
+                       help="Keep matching files even if an exclude pattern matches them; files "
+                            "inside an excluded directory stay out (repeatable)")
+    files.add_argument("--exclude-from", action="append", default=[], metavar="FILE",
+                       help="Read exclude patterns from a file, e.g. the project's .gitignore (repeatable)")
+    files.add_argument("--no-default-excludes", action="store_true",
+                       help="Archive .git, node_modules, __pycache__ and the like as well")
+
+    github = publish.add_argument_group("GitHub")
+    github.add_argument("--github", metavar="OWNER/REPO", help="Publish to this GitHub repository")
+    github.add_argument("--gh-token", help=f"GitHub token (default: ${GITHUB_TOKEN_ENV})")
+    github.add_argument("--tag", help="Release tag, e.g. v1.0.0")
+    github.add_argument("--name", help="Release name")
+    github.add_argument("--body", help="Release description")
+    github.add_argument("--target", help="Target commitish (default: main)")
+    github.add_argument("--discussion-category", help="Discussion category name")
+    github.add_argument("--generate-release-notes", action="store_true", default=None)
+    github.add_argument("--make-latest", choices=["true", "false", "legacy"])
+    github.add_argument("--prerelease", action="store_true", default=None)
+
+    jfrog = publish.add_argument_group("JFrog")
+    jfrog.add_argument("--jfrog", metavar="URL", help="Publish to this Artifactory base URL")
+    jfrog.add_argument("--jfrog-repo", help="Artifactory repository")
+    jfrog.add_argument("--jfrog-token", help=f"JFrog token (default: ${JFROG_TOKEN_ENV})")
+
+    batch = subparsers.add_parser("batch", parents=[metrics], help="Publish many releases from a JSON/YAML manifest")
+    batch.add_argument("manifest", help="Batch manifest listing repos, tags, metadata and asset globs")
+    batch.add_argument("--gh-token", help=f"GitHub token (default: ${GITHUB_TOKEN_ENV})")
+    batch.add_argument("--concurrency", type=int, default=4, help="Releases published at once (default: 4)")
+    batch.add_argument("--max-rate", type=float, metavar="PER_SECOND",
+                       help="Requests per second to each host across all workers; halved whenever "
+                            "GitHub rate limits the batch (default: 10)")
+
+    join = subparsers.add_parser("join", help="Reassemble a split archive from its .volumes.json manifest")
+    join.add_argument("manifest", help="The <archive>.volumes.json downloaded next to the volumes")
+    join.add_argument("--output", help="Where to write the archive (default: next to the manifest)")
+
+    subparsers.add_parser("gui", help="Start the desktop application")
+    return parser
+
+
+def resolve_publish_args(parser, args):
+    for key, value in load_config_defaults(args.config).items():
+        if getattr(args, key) is None and value is not None:
+            setattr(args, key, value)
+    args.gh_token = args.gh_token or os.environ.get(GITHUB_TOKEN_ENV)
+    args.jfrog_token = args.jfrog_token or os.environ.get(JFROG_TOKEN_ENV)
+    args.format = args.format or "zip"
+
+    if not (args.dir or args.zip):
+        parser.error("publish needs --dir or --zip")
+    if not (args.github or args.jfrog):
+        parser.error("publish needs --github and/or --jfrog")
+    if args.github:
+        if args.github.count("/") != 1 or not all(args.github.split("/")):
+            parser.error("--github must be OWNER/REPO")
+        if not (args.gh_token and args.tag):
+            parser.error(f"--github needs --tag and a token (--gh-token or ${GITHUB_TOKEN_ENV})")
+    if args.jfrog and not (args.jfrog_repo and args.jfrog_token):
+        parser.error(f"--jfrog needs --jfrog-repo and a token (--jfrog-token or ${JFROG_TOKEN_ENV})")
+    if args.dir and not os.path.isdir(args.dir):
+        parser.error(f"--dir '{args.dir}' is not a directory")
+    if args.stream and not args.dir:
+        parser.error("--stream needs --dir")
+    if args.volume_size is not None and args.volume_size < 0:
+        parser.error("--volume-size must not be negative")
+    if args.dir and not args.zip:
+        extension = ".tar.zst" if args.format == "tar.zst" else ".zip"
+        args.zip = os.path.join(os.getcwd(), os.path.basename(args.dir.rstrip('/\\')) + extension)
+
+
+def run_publish(args):
+    from .archive import (DEFAULT_VOLUME_SIZE, VolumeWriter, archive_assets, asset_content_type, build_archive,
+                          checksums_for, get_archive_writer, split_volumes)
+    from .checksums import HashingWriter
+    from .github import GitHubUploader, build_release_data
+    from .jfrog import JFrogUploader
+    from .http import describe_budget
+    from .publish import publish_assets, publish_streaming, run_destination
+    from .scanner import load_ignore_rules
+
+    volume_size = DEFAULT_VOLUME_SIZE if args.volume_size is None else args.volume_size * 1024 * 1024
+    github = jfrog = release_data = None
+    if args.github:
+        owner, repo = args.github.split("/")
+        github = GitHubUploader(args.gh_token, owner, repo)
+        release_data = build_release_data(
+            args.tag,
+            target_commitish=args.target or "main",
+            name=args.name or "",
+            body=args.body or "",
+            prerelease=bool(args.prerelease),
+            discussion_category_name=args.discussion_category,
+            generate_release_notes=bool(args.generate_release_notes),
+            make_latest=args.make_latest or "true",
+        )
+    if args.jfrog:
+        jfrog = JFrogUploader(args.jfrog, args.jfrog_token, args.jfrog_repo)
+    ignore = None
+    if args.dir:
+        ignore = load_ignore_rules(args.dir, exclude=args.exclude, include=args.include,
+                                   exclude_from=args.exclude_from,
+                                   default_excludes=not args.no_default_excludes)
+
+    def publish_to_github(file_path, body=None, digests=None):
+        return github.publish(release_data, file_path, body=body, content_type=asset_content_type(file_path),
+                              sha256=digests["sha256"] if digests else None)
+
+    if args.stream:
+        # The archive goes straight from the compressor into the requests:
+        # JFrog receives it with chunked transfer encoding while it is being
+        # written; GitHub needs a Content-Length, so it gets a single spooled
+        # copy once packaging is done. The archive is hashed on its way into
+        # the pipe, so the spooled copy is never read back just for that.
+        # An archive over the volume size is spooled straight into volumes,
+        # hashed as they are written, rather than split afterwards.
+        writer = get_archive_writer(args.format, level=args.level, workers=args.workers, ignore=ignore)
+        archive_name = os.path.basename(args.zip)
+        stats = {}
+        digests = {}
+        spools = []
+
+        def open_spool(spool_path):
+            spools.append(VolumeWriter(spool_path, volume_size))
+            return spools[-1]
+
+        def write_archive(fileobj):
+            output = HashingWriter(fileobj)
+            stats.update(writer.write_stream(args.dir, output, progress=ProgressPrinter("Packaging")))
+            digests.update(output.hexdigests())
+
+        def publish_spool(spool_path):
+            if spools:
+                assets, known = spools[0].assets, spools[0].checksums
+            else:
+                assets, known = [spool_path], {spool_path: digests}
+            checksums = checksums_for(assets, known)
+            uploaded = [publish_to_github(asset, digests=checksums[asset]) for asset in assets]
+            uploaded.append(github.publish_checksums(release_data, checksums))
+            return uploaded if any(uploaded) else None
+
+        results = publish_streaming(
+            write_archive, archive_name,
+            streamed={"JFrog": lambda body: jfrog.upload_artifact(archive_name, body=body)} if jfrog else None,
+            spooled={"GitHub": publish_spool} if github else None,
+            spool_dir=args.spool_dir, open_spool=open_spool if volume_size else None,
+        )
+        logging.info(f"Packaged {stats.get('files', 0)} files into '{archive_name}' "
+                     f"({stats.get('bytes_out', 0) / (1024 * 1024):.1f} MiB) while uploading")
+    else:
+        if args.dir:
+            assets, stats = build_archive(
+                args.dir, args.zip, archive_format=args.format, level=args.level, workers=args.workers,
+                volume_size=volume_size, incremental=not args.no_incremental,
+                progress=ProgressPrinter("Compressing"), ignore=ignore,
+            )
+            logging.info(f"Compressed {stats['files']} files into '{args.zip}' "
+                         f"({stats['reused']} unchanged since the last build)")
+        else:
+            # An archive split by an earlier run is uploaded as its volumes;
+            # one that was never split is split now if it is too large
+            assets = archive_assets(args.zip)
+            if assets == [args.zip] and volume_size:
+                assets = split_volumes(args.zip, volume_size)
+
+        # Digests recorded while the archive (and its volumes) were written
+        checksums = checksums_for(assets)
+
+        def destinations(file_path):
+            targets = {}
+            digests = checksums.get(file_path)
+            if github:
+                targets["GitHub"] = lambda body: publish_to_github(file_path, body, digests)
+            if jfrog and digests:
+                targets["JFrog"] = lambda body: jfrog.upload_artifact(file_path, body=body, checksums=digests)
+            return targets
+
+        results = publish_assets(assets, destinations, progress=ProgressPrinter("Uploading"))
+        # SHA256SUMS is a GitHub release asset only, listing the release's
+        # earlier assets too; it is left alone if any upload failed
+        if github and all(result.ok for result in results):
+            results.append(run_destination("GitHub", github.publish_checksums, release_data, checksums))
+
+    for result in results:
+        print(result.describe())
+    if github:
+        logging.info(f"GitHub API budget: {describe_budget(github.rate_limit())}")
+    return 0 if all(result.ok for result in results) else 1
+
+
+def run_join(args):
+    from .archive import join_volumes
+
+    output_path = join_volumes(args.manifest, args.output)
+    print(f"Reassembled '{output_path}'")
+    return 0
+
+
+def run_batch_manifest(args):
+    from .batch import format_summary, load_batch_manifest, run_batch
+
+    releases = load_batch_manifest(args.manifest)
+    results = run_batch(releases, args.gh_token, concurrency=args.concurrency,
+                        progress=ProgressPrinter("Uploading"), rate=args.max_rate)
+    print(format_summary(results))
+    return 0 if all(result.ok for result in results) else 1
+
+
+def run_instrumented(command, args):
+    # Runs the command under cProfile if asked, and exports the recorded
+    # spans afterwards, whether or not the command succeeded
+    from .metrics import ThreadProfiler, default_recorder
+
+    default_recorder.clear()
+    profiler = None
+    if args.profile:
+        # Worker threads are profiled too, and merged into the one dump
+        profiler = ThreadProfiler()
+        profiler.start()
+    try:
+        return command(args)
+    finally:
+        if profiler:
+            profiler.stop(args.profile)
+            logging.info(f"Profile written to '{args.profile}' (python -m pstats {args.profile})")
+        if args.metrics_jsonl:
+            default_recorder.write_jsonl(args.metrics_jsonl)
+        if args.metrics_prom:
+            default_recorder.write_prometheus(args.metrics_prom)
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.command == "gui":
+        from .gui import main as gui_main
+        gui_main()
+        return 0
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    if args.command == "batch":
+        args.gh_token = args.gh_token or os.environ.get(GITHUB_TOKEN_ENV)
+        if not args.gh_token:
+            parser.error(f"batch needs a token (--gh-token or ${GITHUB_TOKEN_ENV})")
+        if args.concurrency < 1:
+            parser.error("--concurrency must be at least 1")
+        command = run_batch_manifest
+    elif args.command == "join":
+        command = run_join
+    else:
+        resolve_publish_args(parser, args)
+        command = run_publish
+    try:
+        if args.command == "join":
+            return command(args)
+        return run_instrumented(command, args)
+    except KeyboardInterrupt:
+        return 130
+    except Exception as e:
+        logging.error(str(e))
+        return 1
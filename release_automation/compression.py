@@ -0,0 +1,344 @@
+import hashlib
+import os
+import struct
+import sys
+import tempfile
+import time
+import zlib
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from .checksums import HashingWriter, file_sha256
+from .manifest import load_manifest, save_manifest
+from .metrics import span
+from .scanner import scan_directory
+
+# Members with these extensions are already compressed; deflating them again
+# burns CPU for no gain, so they are stored as-is
+STORED_EXTENSIONS = frozenset({
+    '.zip', '.jar', '.war', '.ear', '.whl', '.apk', '.nupkg',
+    '.gz', '.tgz', '.bz2', '.xz', '.zst', '.lz4', '.7z', '.rar',
+    '.png', '.jpg', '.jpeg', '.gif', '.webp', '.mp3', '.mp4', '.mkv',
+})
+
+ZIP_STORED = 0
+ZIP_DEFLATED = 8
+
+READ_CHUNK_SIZE = 1024 * 1024
+# Compressed members larger than this spill from memory to a temp file
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+# Same threshold zipfile uses before switching to ZIP64 records
+ZIP64_LIMIT = (1 << 31) - 1
+ZIP_MAX_COUNT = 0xFFFF
+
+CREATE_SYSTEM = 0 if sys.platform == 'win32' else 3
+
+
+class CompressedMember:
+    # A member that has been compressed and is ready to be written verbatim
+    def __init__(self, arcname, file_size, compress_size, crc, method, mtime, mode, data,
+                 sha256=None):
+        self.arcname = arcname
+        self.file_size = file_size
+        self.compress_size = compress_size
+        self.crc = crc
+        self.method = method
+        self.mtime = mtime
+        self.mode = mode
+        # Binary file object positioned at the start of the compressed bytes
+        self.data = data
+        self.sha256 = sha256
+
+
+class ArchiveSlice:
+    # Read-only view of the raw compressed bytes of a member in a previous
+    # archive, used to copy unchanged members without recompressing them
+    def __init__(self, fileobj, offset, size):
+        self.fp = fileobj
+        self.position = offset
+        self.remaining = size
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        if not size:
+            return b''
+        self.fp.seek(self.position)
+        data = self.fp.read(size)
+        if len(data) != size:
+            raise EOFError("Previous archive is truncated")
+        self.position += size
+        self.remaining -= size
+        return data
+
+    def close(self):
+        pass
+
+
+def dos_datetime(mtime):
+    # ZIP cannot represent dates before 1980; clamp like zipfile's
+    # strict_timestamps=False does
+    year, month, day, hour, minute, second = time.localtime(mtime)[:6]
+    if year < 1980:
+        year, month, day, hour, minute, second = 1980, 1, 1, 0, 0, 0
+    elif year > 2107:
+        year, month, day, hour, minute, second = 2107, 12, 31, 23, 59, 59
+    dosdate = (year - 1980) << 9 | month << 5 | day
+    dostime = hour << 11 | minute << 5 | (second // 2)
+    return dostime, dosdate
+
+
+class ZipStreamWriter:
+    # Writes already-compressed members sequentially. CRC and sizes are known
+    # before each member is written, so no seeking is needed and the output
+    # may be any writable binary stream.
+    def __init__(self, fileobj):
+        self.fp = fileobj
+        self.offset = 0
+        self.entries = []
+
+    def _write(self, data):
+        self.fp.write(data)
+        self.offset += len(data)
+
+    def write_member(self, member):
+        name = member.arcname.encode('utf-8')
+        flags = 0x800 if not member.arcname.isascii() else 0
+        dostime, dosdate = dos_datetime(member.mtime)
+        zip64 = member.file_size > ZIP64_LIMIT or member.compress_size > ZIP64_LIMIT
+        version = 45 if zip64 else (20 if member.method == ZIP_DEFLATED else 10)
+
+        extra = b''
+        file_size, compress_size = member.file_size, member.compress_size
+        if zip64:
+            extra = struct.pack('<HHQQ', 1, 16, file_size, compress_size)
+            file_size = compress_size = 0xFFFFFFFF
+
+        header_offset = self.offset
+        self._write(struct.pack(
+            '<4s2B4HL2L2H', b'PK\003\004', version, 0, flags, member.method,
+            dostime, dosdate, member.crc, compress_size, file_size, len(name), len(extra),
+        ))
+        self._write(name)
+        self._write(extra)
+        data_offset = self.offset
+        while True:
+            chunk = member.data.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            self._write(chunk)
+
+        self.entries.append((member, name, flags, version, dostime, dosdate, header_offset))
+        return data_offset
+
+    def close(self):
+        central_dir_offset = self.offset
+        for member, name, flags, version, dostime, dosdate, header_offset in self.entries:
+            file_size, compress_size = member.file_size, member.compress_size
+            extra = b''
+            if file_size > ZIP64_LIMIT or compress_size > ZIP64_LIMIT or header_offset > ZIP64_LIMIT:
+                extra = struct.pack('<HHQQQ', 1, 24, file_size, compress_size, header_offset)
+                file_size = compress_size = header_offset = 0xFFFFFFFF
+                version = 45
+            self._write(struct.pack(
+                '<4s4B4HL2L5H2L', b'PK\001\002', version, CREATE_SYSTEM, version, 0,
+                flags, member.method, dostime, dosdate, member.crc, compress_size,
+                file_size, len(name), len(extra), 0, 0, 0,
+                (member.mode & 0xFFFF) << 16, header_offset,
+            ))
+            self._write(name)
+            self._write(extra)
+
+        central_dir_size = self.offset - central_dir_offset
+        count = len(self.entries)
+        if count > ZIP_MAX_COUNT or central_dir_offset > ZIP64_LIMIT or central_dir_size > ZIP64_LIMIT:
+            zip64_end_offset = self.offset
+            self._write(struct.pack(
+                '<4sQ2H2L4Q', b'PK\006\006', 44, 45, 45, 0, 0,
+                count, count, central_dir_size, central_dir_offset,
+            ))
+            self._write(struct.pack('<4sLQL', b'PK\006\007', 0, zip64_end_offset, 1))
+            count = min(count, ZIP_MAX_COUNT)
+            central_dir_size = min(central_dir_size, 0xFFFFFFFF)
+            central_dir_offset = min(central_dir_offset, 0xFFFFFFFF)
+        self._write(struct.pack(
+            '<4s4H2LH', b'PK\005\006', 0, 0, count, count,
+            central_dir_size, central_dir_offset, 0,
+        ))
+
+
+def compress_file(entry, compresslevel=6, store=False):
+    # Runs in a worker thread; zlib releases the GIL while deflating. entry is
+    # a ScanEntry, whose stat fields are reused rather than stat'ed again.
+    method = ZIP_STORED if store else ZIP_DEFLATED
+    compressor = None if store else zlib.compressobj(compresslevel, zlib.DEFLATED, -15)
+    out = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    digest = hashlib.sha256()
+    crc = 0
+    file_size = 0
+    with open(entry.path, 'rb') as f:
+        while True:
+            chunk = f.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            file_size += len(chunk)
+            crc = zlib.crc32(chunk, crc)
+            digest.update(chunk)
+            out.write(compressor.compress(chunk) if compressor else chunk)
+    if compressor:
+        out.write(compressor.flush())
+    compress_size = out.tell()
+    out.seek(0)
+    return CompressedMember(entry.arcname, file_size, compress_size, crc, method, entry.mtime, entry.mode, out,
+                            sha256=digest.hexdigest())
+
+
+def prepare_member(entry, previous, compresslevel=6, store=False):
+    # Returns the previous manifest entry when the content is unchanged (only
+    # the mtime moved), otherwise the freshly compressed member. The hashing
+    # is counted in the compress span ("rehashed") rather than a span per file.
+    if previous and previous["size"] == entry.size and file_sha256(entry.path, record=False) == previous["sha256"]:
+        return previous
+    return compress_file(entry, compresslevel, store)
+
+
+def write_zip(fileobj, entries, workers=None, compresslevel=6, store_extensions=STORED_EXTENSIONS,
+              previous=None, previous_archive=None, progress=None):
+    # Deflates members concurrently and writes them to fileobj in order. At
+    # most a few members per worker are in flight so memory stays bounded.
+    # entries are ScanEntry objects, written in the order given (largest
+    # first from scan_directory, so the slowest members start earliest while
+    # small ones fill in behind them); previous maps arcnames to
+    # manifest entries whose raw bytes can be copied from previous_archive.
+    # Returns (stats, manifest members).
+    with span("compress", format="zip") as compress_span:
+        stats, members = _write_zip(fileobj, entries, workers, compresslevel, store_extensions,
+                                    previous, previous_archive, progress)
+        compress_span.set(files=stats["files"], reused=stats["reused"], rehashed=stats["rehashed"],
+                          rehashed_bytes=stats["rehashed_bytes"], bytes=stats["bytes_in"],
+                          bytes_out=stats["bytes_out"])
+    return stats, members
+
+
+def _write_zip(fileobj, entries, workers, compresslevel, store_extensions, previous, previous_archive,
+               progress):
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = workers * 4
+    previous = previous or {}
+    # rehashed counts the files whose mtime changed but whose size did not,
+    # which are hashed to find out whether they can still be reused
+    stats = {"files": 0, "reused": 0, "rehashed": 0, "rehashed_bytes": 0, "bytes_in": 0, "bytes_out": 0}
+    members = []
+    bytes_total = sum(entry.size for entry in entries)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        writer = ZipStreamWriter(fileobj)
+        pending = deque()
+
+        def write_next():
+            scan_entry, result = pending.popleft()
+            if isinstance(result, Future):
+                result = result.result()
+            if isinstance(result, CompressedMember):
+                member = result
+            else:
+                # Unchanged since the last build: copy the raw bytes
+                member = CompressedMember(
+                    scan_entry.arcname, result["size"], result["compress_size"], result["crc"],
+                    result["method"], scan_entry.mtime, scan_entry.mode,
+                    ArchiveSlice(previous_archive, result["offset"], result["compress_size"]),
+                    sha256=result["sha256"],
+                )
+                stats["reused"] += 1
+            try:
+                data_offset = writer.write_member(member)
+            finally:
+                member.data.close()
+            members.append({
+                "path": scan_entry.arcname,
+                "size": member.file_size,
+                "mtime_ns": scan_entry.mtime_ns,
+                "sha256": member.sha256,
+                "crc": member.crc,
+                "method": member.method,
+                "compress_size": member.compress_size,
+                "offset": data_offset,
+            })
+            stats["files"] += 1
+            stats["bytes_in"] += member.file_size
+            if progress:
+                progress(stats["bytes_in"], bytes_total)
+
+        try:
+            for scan_entry in entries:
+                entry = previous.get(scan_entry.arcname)
+                if entry and entry["size"] == scan_entry.size and entry["mtime_ns"] == scan_entry.mtime_ns:
+                    pending.append((scan_entry, entry))
+                else:
+                    if entry and entry["size"] == scan_entry.size:
+                        stats["rehashed"] += 1
+                        stats["rehashed_bytes"] += scan_entry.size
+                    store = os.path.splitext(scan_entry.arcname)[1].lower() in store_extensions
+                    pending.append((scan_entry, pool.submit(
+                        prepare_member, scan_entry, entry, compresslevel, store)))
+                if len(pending) >= max_in_flight:
+                    write_next()
+            while pending:
+                write_next()
+        except BaseException:
+            for scan_entry, result in pending:
+                if isinstance(result, Future):
+                    result.cancel()
+            raise
+        writer.close()
+        stats["bytes_out"] = writer.offset
+    return stats, members
+
+
+def compress_directory(directory, zip_path, workers=None, compresslevel=6,
+                       store_extensions=STORED_EXTENSIONS, incremental=True, progress=None, ignore=None):
+    # Builds zip_path from directory with write_zip.
+    #
+    # A manifest next to the archive records every member. With
+    # incremental=True, members whose size and mtime (or content hash) are
+    # unchanged since it was written are copied raw from the previous archive
+    # instead of being recompressed.
+    #
+    # progress, if given, is called as progress(bytes_done, bytes_total) after
+    # every member; raising from it aborts the build and discards the output.
+    #
+    # The archive is hashed as it is written: stats["digests"] holds its SHA-1
+    # and SHA-256, which the manifest keeps next to every member's SHA-256.
+    #
+    # ignore is an IgnoreRules deciding which files are left out, by default
+    # the directory's .releaseignore on top of DEFAULT_EXCLUDES.
+    previous = load_manifest(zip_path, compresslevel) if incremental else {}
+    partial_path = zip_path + '.partial'
+    entries = scan_directory(directory, ignore)
+
+    previous_archive = open(zip_path, 'rb') if previous else None
+    try:
+        with open(partial_path, 'wb') as f:
+            output = HashingWriter(f)
+            stats, members = write_zip(output, entries, workers, compresslevel, store_extensions,
+                                       previous, previous_archive, progress)
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+    finally:
+        if previous_archive:
+            previous_archive.close()
+
+    os.replace(partial_path, zip_path)
+    stats["digests"] = output.hexdigests()
+    save_manifest(zip_path, compresslevel, members, stats["digests"])
+    return stats
+
+
+def stream_directory(directory, fileobj, workers=None, compresslevel=6,
+                     store_extensions=STORED_EXTENSIONS, progress=None, ignore=None):
+    # Writes a ZIP of directory to any writable stream, e.g. a PipeWriter
+    # feeding an upload; nothing touches the disk and nothing is reused
+    return write_zip(fileobj, scan_directory(directory, ignore), workers, compresslevel, store_extensions,
+                     progress=progress)[0]
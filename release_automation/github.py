@@ -0,0 +1,252 @@
+import logging
+import os
+import tempfile
+import threading
+from urllib.parse import quote
+
+import requests
+
+from .checksums import SHA256SUMS_NAME, file_sha256, write_sha256sums
+from .http import default_pool
+from .metrics import span
+from .release_index import get_index
+from .streaming import ChunkedFileReader
+
+GITHUB_API_URL = "https://api.github.com"
+GITHUB_UPLOADS_URL = "https://uploads.github.com"
+# Largest page size the releases listing accepts
+RELEASES_PER_PAGE = 100
+
+
+def build_release_data(tag_name, target_commitish="main", name="", body="", prerelease=False,
+                       discussion_category_name=None, generate_release_notes=False, make_latest="true"):
+    data = {
+        "tag_name": tag_name,
+        "target_commitish": target_commitish,
+        "name": name,
+        "body": body,
+        "draft": False,
+        "prerelease": prerelease,
+        "discussion_category_name": discussion_category_name or None,
+        "generate_release_notes": generate_release_notes,
+        "make_latest": make_latest
+    }
+
+    # Remove keys with None values
+    return {k: v for k, v in data.items() if v is not None}
+
+
+class GitHubUploader:
+    def __init__(self, gh_token, repo_owner, repo_name, sessions=None, index=None,
+                 api_url=GITHUB_API_URL, uploads_url=GITHUB_UPLOADS_URL):
+        self.repo_owner = repo_owner
+        self.repo_name = repo_name
+        self.headers = {"Authorization": f"token {gh_token}"}
+        # Overridable for GitHub Enterprise Server or a local stand-in
+        self.api_url = api_url.rstrip('/')
+        self.uploads_url = uploads_url.rstrip('/')
+        self.releases_url = f"{self.api_url}/repos/{repo_owner}/{repo_name}/releases"
+        # Keep-alive sessions shared per host
+        self.sessions = sessions or default_pool
+        # On-disk tag -> release cache with the ETags to revalidate it
+        self.index = index or get_index()
+        self.repo_key = f"{repo_owner}/{repo_name}"
+        # Tags already looked up (or created) by release_for
+        self.resolved = set()
+        self.lock = threading.Lock()
+
+    def conditional_get(self, url, etag):
+        headers = dict(self.headers)
+        if etag:
+            headers["If-None-Match"] = etag
+        return self.sessions.get(self.api_url).get(url, headers=headers)
+
+    def find_release_by_tag(self, tag):
+        # One request; a 304 against the cached ETag confirms the cached entry
+        # (and does not count against the API rate limit)
+        cached = self.index.get(self.repo_key, tag)
+        response = self.conditional_get(f"{self.releases_url}/tags/{quote(tag, safe='')}",
+                                        cached["etag"] if cached else None)
+        if response.status_code == 304 and cached:
+            return cached
+        if response.status_code == 404:
+            # Missing, or a draft, which the tags endpoint does not return. A
+            # stale entry is simply overwritten once the release is found or
+            # created again.
+            return None
+        response.raise_for_status()
+        return self.index.remember(self.repo_key, response.json(), response.headers.get("ETag"))
+
+    def find_release_in_listing(self, tag):
+        # Walks the paginated releases listing, revalidating each page by ETag,
+        # and stops at the page that holds the tag
+        url = f"{self.releases_url}?per_page={RELEASES_PER_PAGE}"
+        while url:
+            page = self.index.get_page(self.repo_key, url)
+            response = self.conditional_get(url, page["etag"] if page else None)
+            if response.status_code == 304 and page:
+                if tag in page["tags"]:
+                    return self.index.get(self.repo_key, tag)
+                url = page["next"]
+                continue
+            response.raise_for_status()
+            releases = response.json()
+            for release in releases:
+                self.index.remember(self.repo_key, release)
+            next_url = response.links.get("next", {}).get("url")
+            self.index.set_page(self.repo_key, url, response.headers.get("ETag"),
+                                [release["tag_name"] for release in releases], next_url)
+            if any(release["tag_name"] == tag for release in releases):
+                return self.index.get(self.repo_key, tag)
+            url = next_url
+        return None
+
+    def rate_limit(self):
+        # The API budget left as of the last response, see RateLimiter.budget
+        return self.sessions.budget(self.api_url)
+
+    def get_or_create_release(self, release_data):
+        return self.ensure_release(release_data)["id"]
+
+    def ensure_release(self, release_data):
+        # Returns the index entry (id, tag_name, assets) of the release for
+        # release_data["tag_name"], creating the release if needed
+        tag = release_data["tag_name"]
+        with span("release", repo=self.repo_key, tag=tag) as release_span:
+            try:
+                # A release published before is revalidated with one conditional
+                # request instead of a POST that fails with 422
+                looked_up = False
+                if self.index.get(self.repo_key, tag):
+                    release = self.find_release_by_tag(tag)
+                    if release:
+                        release_span.set(created=False)
+                        return release
+                    looked_up = True
+
+                # Create the release on GitHub
+                session = self.sessions.get(self.api_url)
+                response = session.post(self.releases_url, headers=self.headers, json=release_data)
+                release_span.set(status=response.status_code, created=response.status_code == 201,
+                                 retries=response.retries)
+                if response.status_code == 422:
+                    # The release already exists, get its ID
+                    release = (None if looked_up else self.find_release_by_tag(tag)) \
+                        or self.find_release_in_listing(tag)
+                    if not release:
+                        raise Exception("Release already exists, but could not retrieve its ID.")
+                    return release
+                response.raise_for_status()
+                return self.index.remember(self.repo_key, response.json())
+            finally:
+                self.index.save()
+
+    def release_for(self, release_data):
+        # The index entry of release_data's release. Only the first call per
+        # tag asks GitHub (ensure_release); later ones read the index, which
+        # publish_asset keeps up to date, so publishing several assets and
+        # their SHA256SUMS costs one lookup in all.
+        tag = release_data["tag_name"]
+        with self.lock:
+            if tag not in self.resolved:
+                release = self.ensure_release(release_data)
+                self.resolved.add(tag)
+                return release
+        return self.index.get(self.repo_key, tag)
+
+    def delete_asset(self, asset_id):
+        url = f"{self.releases_url}/assets/{asset_id}"
+        response = self.sessions.get(self.api_url).delete(url, headers=self.headers)
+        if response.status_code != 404:
+            response.raise_for_status()
+
+    def publish_asset(self, release, file_path, content_type="application/zip", progress=None, body=None,
+                      refresh_on_conflict=True, sha256=None):
+        # Uploads file_path to the release unless an identical asset (same
+        # name, size and SHA-256) is already there; a differing or half-
+        # uploaded asset of the same name is deleted and replaced. Returns the
+        # new asset, or None when the upload was skipped. sha256, when the
+        # caller already knows it, saves hashing the file to compare.
+        asset_name = os.path.basename(file_path)
+        tag = release["tag_name"]
+        existing = release["assets"].get(asset_name)
+        with span("github_upload", repo=self.repo_key, asset=asset_name) as upload_span:
+            try:
+                if existing:
+                    if (existing["state"] == "uploaded" and existing["size"] == os.path.getsize(file_path)
+                            and existing["sha256"] and existing["sha256"] == (sha256 or file_sha256(file_path))):
+                        logging.info(f"'{asset_name}' is already up to date on GitHub release {release['id']}")
+                        upload_span.set(skipped=True)
+                        return None
+                    logging.info(f"Replacing '{asset_name}' on GitHub release {release['id']}")
+                    self.delete_asset(existing["id"])
+                    self.index.forget_asset(self.repo_key, tag, asset_name)
+                    upload_span.set(replaced=True)
+
+                # Hash while streaming so the next run can compare without
+                # downloading anything
+                reader = body if body is not None else ChunkedFileReader(file_path, callback=progress, digest="sha256")
+                try:
+                    response = self.upload_asset(release["id"], file_path, content_type, body=reader)
+                except requests.exceptions.HTTPError as e:
+                    # 422 means an asset of this name exists that the index did not
+                    # know about; refresh the release once and decide again
+                    if e.response.status_code != 422 or not (refresh_on_conflict and reader.replayable):
+                        raise
+                    upload_span.set(status=422, retries=e.response.retries, refreshed=True)
+                    fresh = self.find_release_by_tag(tag) or self.find_release_in_listing(tag)
+                    if not fresh:
+                        raise
+                    return self.publish_asset(fresh, file_path, content_type, progress, refresh_on_conflict=False,
+                                              sha256=sha256)
+                asset = response.json()
+                upload_span.set(status=response.status_code, retries=response.retries, bytes=len(reader),
+                                rate_limit_remaining=self.rate_limit()["remaining"])
+                self.index.remember_asset(self.repo_key, tag, asset,
+                                          sha256 or (reader.hexdigest() if reader.replayable else None))
+                return asset
+            finally:
+                self.index.save()
+
+    def upload_asset(self, release_id, file_path, content_type="application/zip", progress=None, body=None):
+        # Returns the response, whose JSON is the new asset; response.retries
+        # tells how often the upload had to be repeated
+        upload_url = (f"{self.uploads_url}/repos/{self.repo_owner}/{self.repo_name}"
+                      f"/releases/{release_id}/assets")
+        asset_name = os.path.basename(file_path)
+
+        # Stream the file from disk instead of reading it into memory, unless
+        # the caller already provides a streaming body for it
+        reader = body if body is not None else ChunkedFileReader(file_path, callback=progress)
+        headers = dict(self.headers, **reader.headers(content_type))
+        session = self.sessions.get(self.uploads_url)
+        response = session.post(upload_url, headers=headers, params={"name": asset_name}, data=reader)
+        response.raise_for_status()
+        logging.info(f"Uploaded '{asset_name}' to GitHub release {release_id}")
+        return response
+
+    def publish_checksums(self, release_data, checksums=None, directory=None):
+        # Uploads a SHA256SUMS covering every asset of the release, not just
+        # the ones published this time: digests of earlier assets come from
+        # the release index, overlaid with checksums ({path: digests}) of the
+        # files just uploaded. Call it after the assets are uploaded. The
+        # file is written to directory, or a temporary one. Returns the new
+        # asset, or None when the release already has an identical SHA256SUMS.
+        release = self.release_for(release_data)
+        sums = {name: asset["sha256"] for name, asset in release["assets"].items()
+                if name != SHA256SUMS_NAME and asset["state"] == "uploaded"}
+        sums.update({os.path.basename(file_path): digests["sha256"]
+                     for file_path, digests in (checksums or {}).items()})
+        for name in [name for name, sha256 in sums.items() if not sha256]:
+            logging.warning(f"The SHA-256 of '{name}' is not known, leaving it out of {SHA256SUMS_NAME}")
+            del sums[name]
+        if directory:
+            return self.publish_asset(release, write_sha256sums(sums, directory), content_type="text/plain")
+        with tempfile.TemporaryDirectory() as tmp:
+            return self.publish_asset(release, write_sha256sums(sums, tmp), content_type="text/plain")
+
+    def publish(self, release_data, file_path, progress=None, body=None, content_type="application/zip",
+                sha256=None):
+        release = self.release_for(release_data)
+        return self.publish_asset(release, file_path, content_type=content_type, progress=progress, body=body,
+                                  sha256=sha256)
@@ -0,0 +1,290 @@
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Enough pooled connections per host for a batch running this many uploads
+DEFAULT_POOL_SIZE = 16
+
+# Transient failures worth another attempt; anything else is returned at once
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+RETRY_EXCEPTIONS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+
+# Requests per second (and burst) allowed per host. GitHub's secondary rate
+# limits start well above this for reads, but trip quickly on bursts of
+# writes from several workers at once.
+DEFAULT_RATE = 10.0
+DEFAULT_BURST = 10
+# The rate never drops below this however often the host pushes back
+MIN_RATE = 0.2
+# Once less than this share of the API budget is left, requests are spread
+# over the time until it resets instead of running into the limit
+BUDGET_RESERVE = 0.1
+# A secondary rate limit without Retry-After is waited out this long
+SECONDARY_LIMIT_WAIT = 60.0
+# Rate limits that reset later than this fail the request instead of stalling
+MAX_RATE_LIMIT_WAIT = 15 * 60
+
+
+def header_int(response, name):
+    value = response.headers.get(name)
+    return int(value) if value and value.isdigit() else None
+
+
+def retry_after(response):
+    # Seconds from a Retry-After header, which is either a number or a date
+    value = response.headers.get('Retry-After') if response is not None else None
+    if not value:
+        return None
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_rate_limited(response):
+    # 429, or a 403 that is GitHub's primary or secondary rate limit rather
+    # than a permission problem
+    if response.status_code == 429:
+        return True
+    if response.status_code != 403:
+        return False
+    if response.headers.get('Retry-After') or response.headers.get('X-RateLimit-Remaining') == '0':
+        return True
+    return 'rate limit' in response.text.lower()
+
+
+def is_replayable(data):
+    # Whether a request body can be sent again on a retry. Bodies fed from
+    # another thread (streaming.QueueBody) and open files cannot.
+    return data is None or isinstance(data, (bytes, str, dict, list, tuple)) or getattr(data, 'replayable', False)
+
+
+class RetryPolicy:
+    def __init__(self, max_attempts=5, backoff=1.0, max_backoff=60.0):
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def delay(self, attempt, response=None):
+        # Exponential backoff with jitter, honouring Retry-After when present
+        seconds = retry_after(response)
+        if seconds is not None:
+            return min(seconds, self.max_backoff)
+        delay = min(self.backoff * 2 ** (attempt - 1), self.max_backoff)
+        return delay + random.uniform(0, delay / 2)
+
+    def rate_limit_delay(self, attempt, response):
+        # How long a rate limited host wants to be left alone: Retry-After,
+        # else until the exhausted budget resets, else a minute (GitHub's
+        # advice for secondary limits) doubling on every further attempt.
+        # Not capped by max_backoff, since retrying earlier only gets
+        # another rejection.
+        seconds = retry_after(response)
+        if seconds is not None:
+            return seconds
+        reset = header_int(response, 'X-RateLimit-Reset')
+        if response.headers.get('X-RateLimit-Remaining') == '0' and reset:
+            return max(1.0, reset - time.time())
+        return SECONDARY_LIMIT_WAIT * 2 ** (attempt - 1)
+
+
+class RateLimiter:
+    # Token bucket shared by every request to one host, plus the API budget
+    # the host reports in X-RateLimit-* headers. Being rate limited pauses
+    # all requests to the host and halves the rate; every success afterwards
+    # wins a little of it back, so a batch settles just under what the host
+    # accepts. As the budget runs low the rate is stretched to last until it
+    # resets.
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.limit = None
+        self.remaining = None
+        # Epoch seconds at which the budget is refilled
+        self.reset = None
+        self.resource = None
+        self.throttled = 0
+        self.lock = threading.Lock()
+
+    def current_rate(self):
+        rate = self.rate
+        if self.remaining is not None and self.limit and self.reset \
+                and self.remaining < self.limit * BUDGET_RESERVE:
+            rate = min(rate, self.remaining / max(1.0, self.reset - time.time()))
+        return max(rate, MIN_RATE)
+
+    def acquire(self):
+        # Blocks until the next request may be sent
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                wait = self.paused_until - now
+                if wait > MAX_RATE_LIMIT_WAIT:
+                    raise Exception(f"API rate limit exhausted, resets in {wait / 60:.0f} minutes")
+                if wait <= 0:
+                    rate = self.current_rate()
+                    self.tokens = min(self.burst, self.tokens + (now - self.updated) * rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / rate
+            time.sleep(wait)
+
+    def update(self, response):
+        # Records the budget from the response headers, if the host sends any
+        with self.lock:
+            limit = header_int(response, 'X-RateLimit-Limit')
+            if limit is not None:
+                self.limit = limit
+                self.remaining = header_int(response, 'X-RateLimit-Remaining')
+                self.reset = header_int(response, 'X-RateLimit-Reset')
+                self.resource = response.headers.get('X-RateLimit-Resource') or self.resource
+            if response.status_code < 400 and self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+            if self.remaining == 0 and self.reset:
+                self.paused_until = max(self.paused_until, time.monotonic() + self.reset - time.time())
+
+    def throttle(self, delay):
+        # The host rejected a request for going too fast
+        with self.lock:
+            self.throttled += 1
+            self.rate = max(MIN_RATE, self.rate / 2)
+            self.tokens = 0.0
+            self.paused_until = max(self.paused_until, time.monotonic() + delay)
+
+    def budget(self):
+        # What the host last reported, e.g. {"limit": 5000, "remaining": 4870,
+        # "reset": 1700000000, ...}; limit and remaining are None for hosts
+        # that do not send rate limit headers
+        with self.lock:
+            return {
+                "limit": self.limit,
+                "remaining": self.remaining,
+                "reset": self.reset,
+                "resource": self.resource,
+                "rate": round(self.current_rate(), 3),
+                "throttled": self.throttled,
+            }
+
+
+class ApiSession(requests.Session):
+    # A requests.Session that paces requests through the host's RateLimiter
+    # and retries rate limits, 5xx and dropped connections. Only bodies that
+    # can be sent again are retried; the response of the last attempt is
+    # returned either way, with the number of retries as response.retries.
+    # Callers may pass retry=RetryPolicy(...) to any request method.
+    def __init__(self, limiter, retry):
+        super().__init__()
+        self.limiter = limiter
+        self.retry = retry
+
+    def request(self, method, url, *args, retry=None, **kwargs):
+        policy = retry or self.retry
+        max_attempts = policy.max_attempts if is_replayable(kwargs.get('data')) else 1
+        attempt = 0
+        while True:
+            attempt += 1
+            self.limiter.acquire()
+            try:
+                response = super().request(method, url, *args, **kwargs)
+            except RETRY_EXCEPTIONS as e:
+                if attempt >= max_attempts:
+                    raise
+                delay = policy.delay(attempt)
+                logging.warning(f"{method} {url} failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            response.retries = attempt - 1
+            self.limiter.update(response)
+
+            if is_rate_limited(response):
+                delay = policy.rate_limit_delay(attempt, response)
+                # Every thread sending to this host waits it out, not just this one
+                self.limiter.throttle(delay)
+                if attempt >= max_attempts or delay > MAX_RATE_LIMIT_WAIT:
+                    return response
+                logging.warning(f"Rate limited by {urlsplit(url).netloc} (HTTP {response.status_code}), "
+                                f"retrying in {delay:.1f}s")
+            elif response.status_code in RETRY_STATUS_CODES and attempt < max_attempts:
+                delay = policy.delay(attempt, response)
+                logging.warning(f"HTTP {response.status_code} from {method} {url}, retrying in {delay:.1f}s")
+                time.sleep(delay)
+            else:
+                return response
+            response.close()
+
+
+class SessionPool:
+    # One session per scheme://host, so repeated calls to the same API reuse
+    # keep-alive connections instead of paying a TLS handshake per request as
+    # the module-level requests.post/put helpers do. Each host also gets the
+    # RateLimiter that every worker sharing the pool draws from.
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, rate=DEFAULT_RATE, burst=DEFAULT_BURST, retry=None):
+        self.pool_size = pool_size
+        self.rate = rate
+        self.burst = burst
+        self.retry = retry or RetryPolicy()
+        self.sessions = {}
+        self.lock = threading.Lock()
+
+    def host_key(self, url):
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    def get(self, url):
+        key = self.host_key(url)
+        with self.lock:
+            session = self.sessions.get(key)
+            if session is None:
+                session = ApiSession(RateLimiter(self.rate, self.burst), self.retry)
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount(key, adapter)
+                self.sessions[key] = session
+            return session
+
+    def budget(self, url):
+        # The API budget of url's host, see RateLimiter.budget
+        return self.get(url).limiter.budget()
+
+    def close(self):
+        with self.lock:
+            for session in self.sessions.values():
+                session.close()
+            self.sessions.clear()
+
+
+# Shared by every uploader unless one is given its own pool
+default_pool = SessionPool()
+
+
+def get_session(url):
+    return default_pool.get(url)
+
+
+def describe_budget(budget):
+    # One line for logs, e.g. "4870 of 5000 requests left, resets at 14:05:00"
+    if budget["remaining"] is None:
+        return "no rate limit reported"
+    text = f"{budget['remaining']} of {budget['limit']} requests left"
+    if budget["reset"]:
+        text += f", resets at {time.strftime('%H:%M:%S', time.localtime(budget['reset']))}"
+    if budget["throttled"]:
+        text += f", throttled {budget['throttled']} times"
+    return text
@@ -0,0 +1,105 @@
+import logging
+import os
+import time
+
+from .checksums import file_digests
+from .http import RETRY_EXCEPTIONS, RETRY_STATUS_CODES, RetryPolicy, default_pool
+from .metrics import span
+from .streaming import ChunkedFileReader
+
+# upload_artifact runs its own attempts, each starting with a checksum deploy
+SINGLE_ATTEMPT = RetryPolicy(max_attempts=1)
+
+
+class JFrogUploader:
+    def __init__(self, jfrog_url, jfrog_token, repository, max_attempts=5, backoff=1.0, max_backoff=60.0,
+                 sessions=None):
+        self.jfrog_url = jfrog_url.rstrip('/')
+        self.jfrog_token = jfrog_token
+        self.repository = repository
+        self.retry = RetryPolicy(max_attempts, backoff, max_backoff)
+        # Keep-alive sessions shared per host
+        self.sessions = sessions or default_pool
+        self.headers = {
+            'Authorization': f'Bearer {self.jfrog_token}'
+        }
+
+    def artifact_url(self, artifact_name):
+        return f"{self.jfrog_url}/artifactory/{self.repository}/{artifact_name}"
+
+    def checksum_deploy(self, upload_url, checksum_headers):
+        # Asks Artifactory to create the artifact from content it already
+        # stores. 404 means the server does not have these bytes yet.
+        headers = dict(self.headers, **checksum_headers)
+        headers['X-Checksum-Deploy'] = 'true'
+        return self.sessions.get(upload_url).put(upload_url, headers=headers, retry=SINGLE_ATTEMPT)
+
+    def upload_artifact(self, file_path, progress=None, body=None, checksums=None):
+        artifact_name = os.path.basename(file_path)
+        upload_url = self.artifact_url(artifact_name)
+
+        # A one-shot body (fed by a ChunkBroadcaster) cannot be replayed, so
+        # it gets a single attempt, and the file is not read again here just
+        # to hash it
+        one_shot = body is not None and not body.replayable
+
+        # Checksums let Artifactory deduplicate and verify the upload
+        if checksums is None and not one_shot:
+            checksums = file_digests(file_path, ('sha1', 'sha256'))
+        checksum_headers = {}
+        if checksums:
+            checksum_headers = {
+                'X-Checksum-Sha1': checksums['sha1'],
+                'X-Checksum-Sha256': checksums['sha256'],
+            }
+
+        # Every attempt starts with a checksum deploy, so an upload that did
+        # reach the server before the connection dropped is not sent again.
+        # The session sends each request once (while still pacing the host);
+        # retrying here keeps a multi-GB body from being re-sent blindly.
+        max_attempts = 1 if one_shot else self.retry.max_attempts
+        session = self.sessions.get(upload_url)
+        attempt = 0
+        with span("jfrog_deploy", repository=self.repository, artifact=artifact_name) as deploy_span:
+            while True:
+                attempt += 1
+                deploy_span.set(retries=attempt - 1)
+                response = None
+                reader = None
+                try:
+                    if checksum_headers:
+                        response = self.checksum_deploy(upload_url, checksum_headers)
+                        if response.status_code in (200, 201):
+                            logging.info(f"'{artifact_name}' already stored in JFrog, deployed by checksum")
+                            deploy_span.set(status=response.status_code, checksum_deploy=True)
+                            return upload_url
+                    if response is None or response.status_code == 404:
+                        # Stream the file from disk in fixed-size chunks, unless
+                        # the caller already provides a streaming body for it
+                        reader = body if body is not None else ChunkedFileReader(file_path, callback=progress)
+                        headers = dict(self.headers, **reader.headers(), **checksum_headers)
+                        response = session.put(upload_url, data=reader, headers=headers, retry=SINGLE_ATTEMPT)
+                except RETRY_EXCEPTIONS as e:
+                    if attempt >= max_attempts:
+                        raise
+                    delay = self.retry.delay(attempt)
+                    logging.warning(f"Upload of '{artifact_name}' interrupted ({e}), retrying in {delay:.1f}s")
+                    time.sleep(delay)
+                    continue
+
+                deploy_span.set(status=response.status_code)
+                if response.status_code in (200, 201):
+                    logging.info(f"Successfully uploaded '{artifact_name}' to JFrog repository '{self.repository}'")
+                    # A streamed body has no length; count what it sent instead
+                    deploy_span.set(checksum_deploy=False,
+                                    bytes=len(reader) if hasattr(reader, '__len__') else reader.sent)
+                    return upload_url
+                if response.status_code in RETRY_STATUS_CODES and attempt < max_attempts:
+                    delay = self.retry.delay(attempt, response)
+                    logging.warning(f"JFrog returned HTTP {response.status_code} for '{artifact_name}', "
+                                    f"retrying in {delay:.1f}s")
+                    time.sleep(delay)
+                    continue
+                logging.error(f"Failed to upload '{artifact_name}' to JFrog: HTTP {response.status_code}")
+                logging.error(f"Response: {response.text}")
+                raise Exception(f"Failed to upload '{artifact_name}' to JFrog: HTTP {response.status_code}\n{response.text}")
@@ -0,0 +1,138 @@
+import itertools
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Progress events are rate limited so a 200k-file compression does not flood
+# the queue; the final event of a job is always delivered
+PROGRESS_INTERVAL = 0.1
+
+_job_ids = itertools.count(1)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class ProgressEvent:
+    # kind is one of "started", "progress", "done", "error" or "cancelled"
+    def __init__(self, job, kind, bytes_done=0, bytes_total=None, throughput=0.0, eta=None,
+                 result=None, error=None):
+        self.job = job
+        self.kind = kind
+        self.bytes_done = bytes_done
+        self.bytes_total = bytes_total
+        # Bytes per second since the job started
+        self.throughput = throughput
+        # Seconds remaining, or None when the total is unknown
+        self.eta = eta
+        self.result = result
+        self.error = error
+
+    def describe(self):
+        mib = 1024 * 1024
+        text = f"{self.job.name}: {self.bytes_done / mib:.1f}"
+        if self.bytes_total:
+            text += f" / {self.bytes_total / mib:.1f}"
+        text += f" MiB, {self.throughput / mib:.1f} MiB/s"
+        if self.eta is not None:
+            text += f", ETA {self.eta:.0f}s"
+        return text
+
+
+class Job:
+    def __init__(self, name, events):
+        self.id = next(_job_ids)
+        self.name = name
+        self.events = events
+        self.future = None
+        self.started = None
+        self.last_event = 0.0
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+        # A job that never started produces no events of its own
+        if self.future and self.future.cancel():
+            self.events.put(ProgressEvent(self, "cancelled"))
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def check_cancelled(self):
+        if self._cancelled.is_set():
+            raise JobCancelled(f"Job '{self.name}' was cancelled")
+
+    def report(self, bytes_done, bytes_total=None):
+        # Passed to the job function as its progress callback. Raising here is
+        # how cancellation reaches code deep inside a compression or upload.
+        self.check_cancelled()
+        now = time.monotonic()
+        if now - self.last_event < PROGRESS_INTERVAL and bytes_done != bytes_total:
+            return
+        self.last_event = now
+        elapsed = now - self.started if self.started else 0
+        throughput = bytes_done / elapsed if elapsed > 0 else 0.0
+        eta = None
+        if bytes_total and throughput > 0:
+            eta = max(bytes_total - bytes_done, 0) / throughput
+        self.events.put(ProgressEvent(self, "progress", bytes_done, bytes_total, throughput, eta))
+
+    def result(self, timeout=None):
+        return self.future.result(timeout)
+
+    def done(self):
+        return self.future.done()
+
+
+class JobScheduler:
+    # Runs compression and upload jobs on worker threads. Every job function
+    # receives a progress=callback keyword; events (progress, completion,
+    # errors) are pushed onto a thread-safe queue that a GUI can poll with
+    # after() or a headless caller can simply ignore and wait on job.result().
+    def __init__(self, max_workers=2):
+        self.events = queue.Queue()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="release-job")
+        self.jobs = []
+
+    def submit(self, name, func, *args, **kwargs):
+        job = Job(name, self.events)
+        job.future = self.executor.submit(self._run, job, func, args, kwargs)
+        self.jobs = [j for j in self.jobs if not j.done()] + [job]
+        return job
+
+    def active_jobs(self):
+        return [job for job in self.jobs if not job.done()]
+
+    def _run(self, job, func, args, kwargs):
+        job.started = time.monotonic()
+        self.events.put(ProgressEvent(job, "started"))
+        try:
+            job.check_cancelled()
+            result = func(*args, progress=job.report, **kwargs)
+        except JobCancelled as e:
+            logging.info(f"Job '{job.name}' cancelled")
+            self.events.put(ProgressEvent(job, "cancelled", error=e))
+            raise
+        except Exception as e:
+            logging.error(f"Job '{job.name}' failed: {e}")
+            self.events.put(ProgressEvent(job, "error", error=e))
+            raise
+        self.events.put(ProgressEvent(job, "done", result=result))
+        return result
+
+    def drain_events(self):
+        while True:
+            try:
+                yield self.events.get_nowait()
+            except queue.Empty:
+                return
+
+    def shutdown(self, cancel=True):
+        if cancel:
+            for job in self.active_jobs():
+                job.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=cancel)
@@ -0,0 +1,72 @@
+import json
+import logging
+import os
+
+# The manifest lives next to the archive: release.zip -> release.zip.manifest.json
+MANIFEST_SUFFIX = '.manifest.json'
+MANIFEST_VERSION = 1
+
+
+def manifest_path_for(zip_path):
+    return zip_path + MANIFEST_SUFFIX
+
+
+def load_manifest(zip_path, compresslevel):
+    # Returns {arcname: entry} for the archive at zip_path, or {} when there is
+    # no manifest or it no longer describes that archive
+    manifest_path = manifest_path_for(zip_path)
+    if not (os.path.exists(manifest_path) and os.path.exists(zip_path)):
+        return {}
+    try:
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        logging.warning(f"Ignoring unreadable manifest '{manifest_path}': {e}")
+        return {}
+
+    st = os.stat(zip_path)
+    archive = manifest.get("archive", {})
+    if (manifest.get("version") != MANIFEST_VERSION
+            or manifest.get("compresslevel") != compresslevel
+            or archive.get("size") != st.st_size
+            or archive.get("mtime_ns") != st.st_mtime_ns):
+        logging.info(f"Manifest '{manifest_path}' is stale, rebuilding from scratch")
+        return {}
+    return {entry["path"]: entry for entry in manifest.get("members", [])}
+
+
+def load_archive_digests(archive_path):
+    # The archive's digests ({"sha1": ..., "sha256": ...}) recorded when it
+    # was written, or None when the manifest has none or is stale
+    manifest_path = manifest_path_for(archive_path)
+    if not (os.path.exists(manifest_path) and os.path.exists(archive_path)):
+        return None
+    try:
+        with open(manifest_path, 'r') as f:
+            archive = json.load(f).get("archive", {})
+    except (OSError, ValueError):
+        return None
+    st = os.stat(archive_path)
+    if archive.get("size") != st.st_size or archive.get("mtime_ns") != st.st_mtime_ns:
+        return None
+    digests = archive.get("digests")
+    return digests if digests and "sha1" in digests and "sha256" in digests else None
+
+
+def save_manifest(zip_path, compresslevel, members, digests=None):
+    # members carry each file's SHA-256; digests are those of the archive
+    # itself, computed while it was written
+    st = os.stat(zip_path)
+    archive = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+    if digests:
+        archive["digests"] = digests
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "compresslevel": compresslevel,
+        "archive": archive,
+        "members": members,
+    }
+    manifest_path = manifest_path_for(zip_path)
+    with open(manifest_path + '.tmp', 'w') as f:
+        json.dump(manifest, f)
+    os.replace(manifest_path + '.tmp', manifest_path)
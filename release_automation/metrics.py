@@ -0,0 +1,204 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+# Finished spans kept in memory; a long-running GUI session drops the oldest
+MAX_SPANS = 10000
+
+# Prometheus metric names are prefixed with this
+METRIC_PREFIX = "release_automation"
+
+
+class Span:
+    # One timed pipeline stage. Well-known attributes are "bytes", "status"
+    # (the last HTTP status) and "retries"; anything else is exported as is.
+    def __init__(self, name, **attributes):
+        self.name = name
+        self.attributes = attributes
+        self.started = time.time()
+        self.start = time.perf_counter()
+        self.duration = None
+        self.error = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.start
+
+    def to_dict(self):
+        data = {
+            "span": self.name,
+            "start": round(self.started, 6),
+            "duration_s": round(self.duration, 6) if self.duration is not None else None,
+        }
+        data.update(self.attributes)
+        if self.attributes.get("bytes") and self.duration:
+            data["throughput_mib_s"] = round(self.attributes["bytes"] / self.duration / (1024 * 1024), 3)
+        if self.error:
+            data["error"] = self.error
+        return data
+
+
+class SpanContext:
+    def __init__(self, recorder, span):
+        self.recorder = recorder
+        self.span = span
+
+    def __enter__(self):
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.span.error = exc_type.__name__
+            # An HTTP error carries the status of the failed request, and its
+            # retries when it went through an ApiSession
+            response = getattr(exc, "response", None)
+            if response is not None and "status" not in self.span.attributes:
+                self.span.set(status=response.status_code)
+                if hasattr(response, "retries"):
+                    self.span.set(retries=response.retries)
+        self.span.finish()
+        self.recorder.record(self.span)
+        return False
+
+
+def format_value(value):
+    # Integers stay exact; %g would turn byte counts into rounded exponents
+    return str(value) if isinstance(value, int) else repr(round(value, 6))
+
+
+class MetricsRecorder:
+    # Collects finished spans from any thread and exports them as JSON lines
+    # or as a Prometheus text file (for node_exporter's textfile collector)
+    def __init__(self, max_spans=MAX_SPANS):
+        self.spans = deque(maxlen=max_spans)
+        self.lock = threading.Lock()
+
+    def span(self, name, **attributes):
+        # with recorder.span("compress", format="zip") as span: ... span.set(bytes=n)
+        return SpanContext(self, Span(name, **attributes))
+
+    def record(self, span):
+        with self.lock:
+            self.spans.append(span)
+
+    def finished(self):
+        with self.lock:
+            return list(self.spans)
+
+    def clear(self):
+        with self.lock:
+            self.spans.clear()
+
+    def write_jsonl(self, path):
+        # Appends one JSON object per span, so successive runs accumulate
+        with open(path, "a") as f:
+            for span in self.finished():
+                f.write(json.dumps(span.to_dict()) + "\n")
+
+    def prometheus_text(self):
+        stages = {}
+        for span in self.finished():
+            stage = stages.setdefault(span.name, {
+                "runs": 0, "errors": 0, "seconds": 0.0, "bytes": 0, "retries": 0,
+                "last_throughput": None, "statuses": {},
+            })
+            stage["runs"] += 1
+            stage["errors"] += 1 if span.error else 0
+            stage["seconds"] += span.duration or 0.0
+            stage["bytes"] += span.attributes.get("bytes") or 0
+            stage["retries"] += span.attributes.get("retries") or 0
+            if span.attributes.get("bytes") and span.duration:
+                stage["last_throughput"] = span.attributes["bytes"] / span.duration
+            status = span.attributes.get("status")
+            if status is not None:
+                stage["statuses"][status] = stage["statuses"].get(status, 0) + 1
+
+        metrics = [
+            ("runs_total", "counter", "Times the pipeline stage ran", "runs"),
+            ("errors_total", "counter", "Times the pipeline stage failed", "errors"),
+            ("duration_seconds_total", "counter", "Time spent in the pipeline stage", "seconds"),
+            ("bytes_total", "counter", "Bytes processed by the pipeline stage", "bytes"),
+            ("retries_total", "counter", "Retried requests in the pipeline stage", "retries"),
+            ("throughput_bytes_per_second", "gauge", "Throughput of the stage's last run", "last_throughput"),
+        ]
+        lines = []
+        for suffix, kind, help_text, key in metrics:
+            name = f"{METRIC_PREFIX}_stage_{suffix}"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for stage_name, stage in sorted(stages.items()):
+                if stage[key] is not None:
+                    lines.append(f'{name}{{stage="{stage_name}"}} {format_value(stage[key])}')
+        name = f"{METRIC_PREFIX}_http_responses_total"
+        lines.append(f"# HELP {name} HTTP responses by pipeline stage and status code")
+        lines.append(f"# TYPE {name} counter")
+        for stage_name, stage in sorted(stages.items()):
+            for status, count in sorted(stage["statuses"].items()):
+                lines.append(f'{name}{{stage="{stage_name}",status="{status}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        # Written to a temp file and renamed, so a collector never reads a
+        # half-written file
+        with open(path + ".tmp", "w") as f:
+            f.write(self.prometheus_text())
+        os.replace(path + ".tmp", path)
+
+
+# Every pipeline stage records here unless given its own recorder
+default_recorder = MetricsRecorder()
+
+
+def span(name, **attributes):
+    return default_recorder.span(name, **attributes)
+
+
+class ThreadProfiler:
+    # Profiles the calling thread and the worker threads that compression,
+    # uploads and batch releases run on, into a single pstats dump. From
+    # Python 3.12 cProfile is built on sys.monitoring, which already covers
+    # every thread but allows only one profiler per process. Before that a
+    # profiler only sees the thread that enables it, so each thread started
+    # while this one runs gets its own cProfile.Profile, merged at the end.
+    def __init__(self):
+        self.profiles = []
+        self.lock = threading.Lock()
+
+    def start(self):
+        if sys.version_info < (3, 12):
+            threading.setprofile(self.profile_thread)
+        self.add_profile()
+
+    def add_profile(self):
+        import cProfile
+
+        profile = cProfile.Profile()
+        with self.lock:
+            self.profiles.append(profile)
+        # Before 3.12 this replaces profile_thread as the thread's profile
+        # function
+        profile.enable()
+
+    def profile_thread(self, frame, event, arg):
+        # Runs on the first event of each new thread
+        self.add_profile()
+
+    def stop(self, path):
+        import pstats
+
+        if sys.version_info < (3, 12):
+            threading.setprofile(None)
+        with self.lock:
+            profiles, self.profiles = self.profiles, []
+        # Disables the calling thread's profile first; worker profiles are
+        # finished by then, or only missing their last few calls
+        profiles[0].disable()
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        stats.dump_stats(path)
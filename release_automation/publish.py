@@ -0,0 +1,151 @@
+import logging
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .streaming import DEFAULT_CHUNK_SIZE, ChunkBroadcaster, ChunkedFileReader, PipeWriter
+
+
+class PublishResult:
+    def __init__(self, destination, ok, result=None, error=None, seconds=0.0):
+        self.destination = destination
+        self.ok = ok
+        self.result = result
+        self.error = error
+        self.seconds = seconds
+
+    def describe(self):
+        if self.ok and self.result is None:
+            return f"{self.destination}: already up to date"
+        if self.ok:
+            return f"{self.destination}: uploaded in {self.seconds:.1f}s"
+        return f"{self.destination}: failed: {self.error}"
+
+
+def run_destination(name, func, *args):
+    # Runs one upload, turning its outcome into a PublishResult; a failure is
+    # logged rather than raised so that other uploads can go ahead
+    start = time.monotonic()
+    try:
+        result = func(*args)
+    except Exception as e:
+        logging.error(f"Publishing to {name} failed: {e}")
+        return PublishResult(name, False, error=e, seconds=time.monotonic() - start)
+    return PublishResult(name, True, result=result, seconds=time.monotonic() - start)
+
+
+def publish_everywhere(file_path, destinations, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    # Uploads one file to several destinations at once, reading it from disk
+    # only once. destinations maps a display name to a callable taking the
+    # request body, e.g. {"GitHub": lambda body: gh.publish(data, path, body=body)}.
+    # Wall-clock time tracks the slowest destination rather than the sum, and
+    # a failing destination does not stop the others.
+    if len(destinations) == 1:
+        # Nothing to share; a replayable reader keeps retries and checksum
+        # deploys available to the single destination
+        (name, func), = destinations.items()
+        return [run_destination(name, func, ChunkedFileReader(file_path, chunk_size, callback=progress))]
+
+    broadcaster = ChunkBroadcaster(file_path, chunk_size, callback=progress)
+    bodies = {name: broadcaster.subscribe() for name in destinations}
+
+    def upload(name, func):
+        start = time.monotonic()
+        body = bodies[name]
+        try:
+            result = func(body)
+        except Exception as e:
+            logging.error(f"Publishing to {name} failed: {e}")
+            return PublishResult(name, False, error=e, seconds=time.monotonic() - start)
+        finally:
+            body.close()
+        return PublishResult(name, True, result=result, seconds=time.monotonic() - start)
+
+    with ThreadPoolExecutor(max_workers=len(destinations), thread_name_prefix="publish") as pool:
+        futures = [pool.submit(upload, name, func) for name, func in destinations.items()]
+        # The calling thread reads the file and feeds every destination
+        broadcaster.run()
+        return [future.result() for future in futures]
+
+
+def publish_assets(file_paths, make_destinations, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    # Publishes several files one after another, e.g. the volumes of a split
+    # archive followed by their reassembly manifest. make_destinations(path)
+    # returns the destinations mapping for one file, as publish_everywhere
+    # takes it. progress covers all files together.
+    bytes_total = sum(os.path.getsize(file_path) for file_path in file_paths)
+    bytes_before = 0
+    results = []
+    for file_path in file_paths:
+        file_progress = None
+        if progress:
+            file_progress = (lambda bytes_done, file_total, offset=bytes_before:
+                             progress(offset + bytes_done, bytes_total))
+        file_results = publish_everywhere(file_path, make_destinations(file_path), chunk_size, file_progress)
+        if len(file_paths) > 1:
+            for result in file_results:
+                result.destination = f"{result.destination} ({os.path.basename(file_path)})"
+        results.extend(file_results)
+        bytes_before += os.path.getsize(file_path)
+    return results
+
+
+def publish_streaming(write_archive, archive_name, streamed=None, spooled=None, spool_dir=None,
+                      chunk_size=DEFAULT_CHUNK_SIZE, progress=None, open_spool=None):
+    # Packages and uploads in one pass, without writing the archive to disk
+    # first. write_archive(fileobj) produces the archive into a PipeWriter on
+    # the calling thread.
+    #
+    # streamed maps a destination name to a callable taking a request body of
+    # unknown length (sent with chunked transfer encoding), and receives the
+    # archive while it is being written. spooled destinations need a
+    # Content-Length (GitHub): the archive is spooled once to
+    # spool_dir/archive_name as it is written, and each callable is called
+    # with that path when packaging is done. The spool is removed afterwards.
+    # open_spool(path), if given, returns the file object to spool into
+    # instead of open(path, 'wb'), e.g. an archive.VolumeWriter.
+    streamed = streamed or {}
+    spooled = spooled or {}
+    spool_root = tempfile.mkdtemp(prefix="release-spool-", dir=spool_dir) if spooled else None
+    spool_path = os.path.join(spool_root, archive_name) if spool_root else None
+
+    def run(name, func, arg):
+        start = time.monotonic()
+        try:
+            result = func(arg)
+        except Exception as e:
+            logging.error(f"Publishing to {name} failed: {e}")
+            return PublishResult(name, False, error=e, seconds=time.monotonic() - start)
+        finally:
+            if hasattr(arg, "close"):
+                arg.close()
+        return PublishResult(name, True, result=result, seconds=time.monotonic() - start)
+
+    try:
+        spool = (open_spool or (lambda path: open(path, 'wb')))(spool_path) if spool_path else None
+        try:
+            pipe = PipeWriter(chunk_size, spool=spool, callback=progress)
+            bodies = {name: pipe.subscribe() for name in streamed}
+            with ThreadPoolExecutor(max_workers=max(1, len(streamed)), thread_name_prefix="publish") as pool:
+                futures = [pool.submit(run, name, func, bodies[name]) for name, func in streamed.items()]
+                try:
+                    write_archive(pipe)
+                    pipe.close()
+                except BaseException as e:
+                    pipe.abort(e)
+                    raise
+                results = [future.result() for future in futures]
+        finally:
+            if spool:
+                spool.close()
+
+        if spooled:
+            with ThreadPoolExecutor(max_workers=len(spooled), thread_name_prefix="publish") as pool:
+                futures = [pool.submit(run, name, func, spool_path) for name, func in spooled.items()]
+                results += [future.result() for future in futures]
+        return results
+    finally:
+        if spool_root:
+            shutil.rmtree(spool_root, ignore_errors=True)
@@ -0,0 +1,134 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+
+INDEX_FILENAME = "github_release_index.json"
+INDEX_VERSION = 2
+
+
+def default_index_path():
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "release_automation", INDEX_FILENAME)
+
+
+def compact_asset(asset, sha256=None):
+    # GitHub reports "sha256:<hex>" digests for newer assets; otherwise fall
+    # back to the digest we computed when we uploaded the asset ourselves
+    digest = asset.get("digest") or ""
+    if digest.startswith("sha256:"):
+        sha256 = digest[len("sha256:"):]
+    return {
+        "id": asset["id"],
+        "size": asset.get("size"),
+        # Interrupted uploads leave assets in the "starter" state
+        "state": asset.get("state", "uploaded"),
+        "sha256": sha256,
+    }
+
+
+def compact_release(release, previous=None):
+    # Only what later lookups and uploads need from a GitHub release object.
+    # Locally computed digests of assets that are still the same (same id)
+    # are carried over from the previous entry.
+    previous_assets = previous["assets"] if previous and previous["id"] == release["id"] else {}
+    assets = {}
+    for asset in release.get("assets", []):
+        cached = previous_assets.get(asset["name"])
+        sha256 = cached["sha256"] if cached and cached["id"] == asset["id"] else None
+        assets[asset["name"]] = compact_asset(asset, sha256)
+    return {"id": release["id"], "tag_name": release["tag_name"], "assets": assets}
+
+
+class ReleaseIndex:
+    # On-disk cache of tag -> release (id, asset ids) per repository, plus the
+    # ETags of the responses it was built from so that repeat lookups can be
+    # conditional requests answered with 304 Not Modified.
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.RLock()
+        self.data = None
+
+    def _repos(self):
+        if self.data is None:
+            self.data = {"version": INDEX_VERSION, "repos": {}}
+            if os.path.exists(self.path):
+                try:
+                    with open(self.path, "r") as f:
+                        data = json.load(f)
+                    if data.get("version") == INDEX_VERSION:
+                        self.data = data
+                except (OSError, ValueError) as e:
+                    logging.warning(f"Ignoring unreadable release index '{self.path}': {e}")
+        return self.data["repos"]
+
+    def _repo(self, repo):
+        return self._repos().setdefault(repo, {"tags": {}, "pages": {}})
+
+    def get(self, repo, tag):
+        with self.lock:
+            entry = self._repo(repo)["tags"].get(tag)
+            return dict(entry) if entry else None
+
+    def remember(self, repo, release, etag=None):
+        with self.lock:
+            tags = self._repo(repo)["tags"]
+            entry = compact_release(release, tags.get(release["tag_name"]))
+            entry["etag"] = etag
+            tags[entry["tag_name"]] = entry
+            return dict(entry)
+
+    def remember_asset(self, repo, tag, asset, sha256=None):
+        with self.lock:
+            entry = self._repo(repo)["tags"].get(tag)
+            if entry:
+                entry["assets"][asset["name"]] = compact_asset(asset, sha256)
+
+    def forget_asset(self, repo, tag, name):
+        with self.lock:
+            entry = self._repo(repo)["tags"].get(tag)
+            if entry:
+                entry["assets"].pop(name, None)
+
+    def get_page(self, repo, url):
+        with self.lock:
+            return self._repo(repo)["pages"].get(url)
+
+    def set_page(self, repo, url, etag, tags, next_url):
+        with self.lock:
+            self._repo(repo)["pages"][url] = {"etag": etag, "tags": tags, "next": next_url}
+
+    def save(self):
+        # Each save writes its own temp file, so processes sharing the cache
+        # (parallel CI jobs on one runner) never rename each other's. The
+        # index is only a cache: failing to write it must not fail a publish.
+        with self.lock:
+            if self.data is None:
+                return
+            directory = os.path.dirname(self.path)
+            tmp_path = None
+            try:
+                os.makedirs(directory, exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(prefix=INDEX_FILENAME + ".", suffix=".tmp", dir=directory)
+                with os.fdopen(fd, "w") as f:
+                    json.dump(self.data, f)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                logging.warning(f"Could not save the release index '{self.path}': {e}")
+                if tmp_path and os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(path=None):
+    # One shared instance per file, so concurrent uploaders in a batch do not
+    # overwrite each other's entries
+    path = os.path.abspath(path or default_index_path())
+    with _indexes_lock:
+        if path not in _indexes:
+            _indexes[path] = ReleaseIndex(path)
+        return _indexes[path]
@@ -0,0 +1,204 @@
+import logging
+import os
+import re
+import stat
+
+from .metrics import span
+
+# Never worth shipping in a release archive: VCS metadata, dependency trees
+# and build caches. Turned off with default_excludes=False.
+DEFAULT_EXCLUDES = (
+    ".git/", ".hg/", ".svn/",
+    "node_modules/", "bower_components/",
+    "__pycache__/", "*.py[co]", ".pytest_cache/", ".mypy_cache/", ".ruff_cache/", ".tox/", ".nox/",
+    ".gradle/", ".sass-cache/", ".parcel-cache/", ".next/cache/", ".cache/",
+    ".DS_Store", "Thumbs.db",
+)
+
+# Read from the root of the packaged directory when present, one pattern per
+# line in .gitignore syntax
+IGNORE_FILE = ".releaseignore"
+
+
+class ScanEntry:
+    # One regular file to archive, keeping only what the archive writers need
+    # from its stat result
+    __slots__ = ("path", "arcname", "size", "mtime_ns", "mode")
+
+    def __init__(self, path, arcname, size, mtime_ns, mode):
+        self.path = path
+        self.arcname = arcname
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.mode = mode
+
+    @property
+    def mtime(self):
+        return self.mtime_ns / 1e9
+
+
+def translate_pattern(pattern):
+    # Turns one .gitignore pattern into (regex, negate, dir_only), or None for
+    # blank lines and comments. The regex matches '/'-separated paths
+    # relative to the scanned directory.
+    pattern = pattern.rstrip("\n\r")
+    if not pattern.strip() or pattern.startswith("#"):
+        return None
+    pattern = pattern.rstrip(" ")
+    negate = pattern.startswith("!")
+    if negate:
+        pattern = pattern[1:]
+    elif pattern.startswith("\\"):
+        # \! and \# match a literal leading ! or #
+        pattern = pattern[1:]
+    dir_only = pattern.endswith("/")
+    pattern = pattern.rstrip("/")
+    # A slash anywhere but at the end anchors the pattern to the root;
+    # otherwise it matches a name at any depth
+    anchored = "/" in pattern
+    pattern = pattern.lstrip("/")
+
+    regex = ""
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if pattern.startswith("**/", i) and (i == 0 or pattern[i - 1] == "/"):
+            regex += "(?:.*/)?"
+            i += 3
+        elif pattern.startswith("**", i):
+            regex += ".*"
+            i += 2
+        elif c == "*":
+            regex += "[^/]*"
+            i += 1
+        elif c == "?":
+            regex += "[^/]"
+            i += 1
+        elif c == "[":
+            end = pattern.find("]", i + 2)
+            if end == -1:
+                regex += re.escape(c)
+                i += 1
+                continue
+            body = pattern[i + 1:end]
+            if body[:1] in ("!", "^"):
+                body = "^" + body[1:]
+            regex += "[" + body.replace("\\", "\\\\") + "]"
+            i = end + 1
+        elif c == "\\" and i + 1 < len(pattern):
+            regex += re.escape(pattern[i + 1])
+            i += 2
+        else:
+            regex += re.escape(c)
+            i += 1
+    prefix = "" if anchored else "(?:.*/)?"
+    return re.compile(f"^{prefix}{regex}$"), negate, dir_only
+
+
+class IgnoreRules:
+    # An ordered list of .gitignore-style patterns. As in git the last
+    # matching pattern decides, "!pattern" re-includes what an earlier one
+    # excluded, and a file inside an excluded directory cannot be re-included
+    # because the directory is never entered.
+    def __init__(self, patterns=()):
+        self.rules = [rule for rule in map(translate_pattern, patterns) if rule]
+        # Without negations the order does not matter, and one alternation
+        # per entry type is much cheaper than trying every pattern in turn
+        self.combined = None
+        if not any(negate for regex, negate, dir_only in self.rules):
+            self.combined = {
+                is_dir: re.compile("|".join(f"(?:{regex.pattern})" for regex, negate, dir_only in self.rules
+                                            if is_dir or not dir_only) or "(?!)")
+                for is_dir in (False, True)
+            }
+
+    def __bool__(self):
+        return bool(self.rules)
+
+    def ignored(self, relpath, is_dir=False):
+        if self.combined:
+            return self.combined[is_dir].match(relpath) is not None
+        result = False
+        for regex, negate, dir_only in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(relpath):
+                result = not negate
+        return result
+
+
+def read_ignore_file(path):
+    with open(path, encoding="utf-8-sig") as f:
+        return f.read().splitlines()
+
+
+def load_ignore_rules(directory, exclude=(), include=(), exclude_from=(), default_excludes=True):
+    # Combines, in increasing priority: the default excludes, the directory's
+    # .releaseignore, any exclude_from files, then exclude and include
+    # patterns (an include re-adds files an exclude or default removed)
+    patterns = list(DEFAULT_EXCLUDES) if default_excludes else []
+    ignore_file = os.path.join(directory, IGNORE_FILE)
+    if os.path.isfile(ignore_file):
+        patterns += read_ignore_file(ignore_file)
+    for path in exclude_from:
+        if not os.path.isfile(path):
+            raise Exception(f"Ignore file not found: {path}")
+        patterns += read_ignore_file(path)
+    patterns += list(exclude)
+    patterns += ["!" + pattern.lstrip("!") for pattern in include]
+    return IgnoreRules(patterns)
+
+
+def scan_tree(directory, ignore=None):
+    # Walks directory with os.scandir. The directory listing already tells
+    # files from directories, so the only syscall per file is the one stat
+    # whose result is kept; arcnames are built from the parent's prefix
+    # instead of os.path.relpath. Symlinked directories are not followed (as
+    # with os.walk); symlinked files are archived as the file they point to.
+    # Unreadable subdirectories are skipped, but an unreadable (or missing)
+    # directory itself raises rather than giving an empty archive.
+    # Returns (entries, excluded count).
+    entries = []
+    excluded = 0
+    stack = [(directory, "")]
+    while stack:
+        path, prefix = stack.pop()
+        try:
+            with os.scandir(path) as it:
+                children = list(it)
+        except OSError as e:
+            if path == directory:
+                raise Exception(f"Cannot read directory '{directory}': {e}")
+            logging.warning(f"Skipping unreadable directory '{path}': {e}")
+            continue
+        for child in children:
+            relpath = prefix + child.name
+            try:
+                is_dir = child.is_dir(follow_symlinks=False)
+                if ignore and ignore.ignored(relpath, is_dir):
+                    excluded += 1
+                    continue
+                if is_dir:
+                    stack.append((child.path, relpath + "/"))
+                    continue
+                st = child.stat()
+            except OSError as e:
+                # Dangling symlink or a file removed while scanning
+                logging.warning(f"Skipping '{child.path}': {e}")
+                continue
+            if stat.S_ISREG(st.st_mode):
+                entries.append(ScanEntry(child.path, relpath, st.st_size, st.st_mtime_ns, st.st_mode))
+    return entries, excluded
+
+
+def scan_directory(directory, ignore=None):
+    # Lists the files to archive, largest first: the compressor starts on the
+    # files that take longest while the small ones fill in behind them, and
+    # the order stays deterministic. ignore defaults to load_ignore_rules().
+    if ignore is None:
+        ignore = load_ignore_rules(directory)
+    with span("scan") as scan_span:
+        entries, excluded = scan_tree(directory, ignore)
+        entries.sort(key=lambda entry: (-entry.size, entry.arcname))
+        scan_span.set(files=len(entries), excluded=excluded, tree_bytes=sum(entry.size for entry in entries))
+    return entries
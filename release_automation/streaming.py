@@ -0,0 +1,221 @@
+import hashlib
+import os
+import queue
+
+# 1 MiB chunks keep syscall overhead low while holding memory use constant
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+
+class ChunkedFileReader:
+    # Streams a file from disk in fixed-size chunks. requests picks up __len__
+    # for the Content-Length and iterates the body instead of buffering it, so
+    # only one chunk is ever held in memory regardless of the file size.
+    replayable = True
+
+    def __init__(self, file_path, chunk_size=DEFAULT_CHUNK_SIZE, callback=None, digest=None):
+        self.file_path = file_path
+        self.chunk_size = chunk_size
+        self.callback = callback
+        self.size = os.path.getsize(file_path)
+        # Optional hashlib algorithm name; the digest of the bytes actually
+        # sent is computed on the fly instead of by a separate read
+        self.digest_name = digest
+        self.digest = None
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        # Reopen on every iteration so the body can be replayed on a retry
+        sent = 0
+        if self.digest_name:
+            self.digest = hashlib.new(self.digest_name)
+        with open(self.file_path, 'rb') as f:
+            while True:
+                chunk = f.read(self.chunk_size)
+                if not chunk:
+                    break
+                if self.digest:
+                    self.digest.update(chunk)
+                sent += len(chunk)
+                if self.callback:
+                    self.callback(sent, self.size)
+                yield chunk
+
+    def headers(self, content_type='application/octet-stream'):
+        return {
+            'Content-Type': content_type,
+            'Content-Length': str(self.size),
+        }
+
+    def hexdigest(self):
+        return self.digest.hexdigest() if self.digest else None
+
+
+# Chunks buffered per destination before the disk reader waits for it
+BROADCAST_QUEUE_CHUNKS = 8
+_END = object()
+
+
+class QueueBody:
+    # Request body fed chunk by chunk from another thread through a bounded
+    # queue. Unlike ChunkedFileReader it can only be iterated once.
+    replayable = False
+
+    def __init__(self):
+        self.queue = queue.Queue(maxsize=BROADCAST_QUEUE_CHUNKS)
+        self.closed = False
+        # Bytes handed to the consumer so far
+        self.sent = 0
+
+    def __iter__(self):
+        while True:
+            item = self.queue.get()
+            if item is _END:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            self.sent += len(item)
+            yield item
+
+    def close(self):
+        # Called once the consumer is finished (or has failed) so the
+        # producer stops feeding it
+        self.closed = True
+
+    def hexdigest(self):
+        return None
+
+
+def feed(body, item):
+    # Blocks until the body accepts the item, unless its consumer has gone
+    while not body.closed:
+        try:
+            body.queue.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            continue
+
+
+class BroadcastBody(QueueBody):
+    # Fed by a ChunkBroadcaster; the file size is known up front
+    def __init__(self, size):
+        super().__init__()
+        self.size = size
+
+    def __len__(self):
+        return self.size
+
+    def headers(self, content_type='application/octet-stream'):
+        return {
+            'Content-Type': content_type,
+            'Content-Length': str(self.size),
+        }
+
+
+class PipeBody(QueueBody):
+    # Fed by a PipeWriter while the archive is still being written. Having no
+    # length, requests sends it with Transfer-Encoding: chunked.
+    def headers(self, content_type='application/octet-stream'):
+        return {'Content-Type': content_type}
+
+
+class ChunkBroadcaster:
+    # Reads a file from disk once and hands every chunk to each subscribed
+    # body. Bounded queues keep memory flat and pace the reader to the slowest
+    # live consumer; consumers that close early are skipped.
+    def __init__(self, file_path, chunk_size=DEFAULT_CHUNK_SIZE, callback=None):
+        self.file_path = file_path
+        self.chunk_size = chunk_size
+        self.callback = callback
+        self.size = os.path.getsize(file_path)
+        self.bodies = []
+
+    def subscribe(self):
+        body = BroadcastBody(self.size)
+        self.bodies.append(body)
+        return body
+
+    def run(self):
+        sent = 0
+        try:
+            with open(self.file_path, 'rb') as f:
+                while any(not body.closed for body in self.bodies):
+                    chunk = f.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    for body in self.bodies:
+                        feed(body, chunk)
+                    sent += len(chunk)
+                    if self.callback:
+                        self.callback(sent, self.size)
+        except BaseException as e:
+            # Abort every consumer with the same error (e.g. a cancellation)
+            for body in self.bodies:
+                feed(body, e)
+            raise
+        for body in self.bodies:
+            feed(body, _END)
+
+
+class PipeWriter:
+    # Write-only file object that an archive writer can produce into. What is
+    # written is cut into chunks and handed to every subscribed PipeBody, and
+    # copied to spool (an open binary file) if given, so packaging and upload
+    # overlap without the archive ever being written out in full first.
+    def __init__(self, chunk_size=DEFAULT_CHUNK_SIZE, spool=None, callback=None):
+        self.chunk_size = chunk_size
+        self.spool = spool
+        self.callback = callback
+        self.bodies = []
+        self.buffer = bytearray()
+        self.written = 0
+        self.closed = False
+
+    def subscribe(self):
+        body = PipeBody()
+        self.bodies.append(body)
+        return body
+
+    def writable(self):
+        return True
+
+    def tell(self):
+        return self.written
+
+    def write(self, data):
+        self.buffer += data
+        self.written += len(data)
+        while len(self.buffer) >= self.chunk_size:
+            chunk = bytes(self.buffer[:self.chunk_size])
+            del self.buffer[:self.chunk_size]
+            self._emit(chunk)
+        return len(data)
+
+    def _emit(self, chunk):
+        if self.spool is not None:
+            self.spool.write(chunk)
+        for body in self.bodies:
+            feed(body, chunk)
+        if self.callback:
+            self.callback(self.written, None)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        # Sends what is left and ends every body
+        if self.closed:
+            return
+        self.closed = True
+        if self.buffer:
+            self._emit(bytes(self.buffer))
+            self.buffer.clear()
+        for body in self.bodies:
+            feed(body, _END)
+
+    def abort(self, error):
+        # Fails every body with the producer's error (e.g. a cancellation)
+        self.closed = True
+        for body in self.bodies:
+            feed(body, error)